@@ -1,11 +1,24 @@
 import axios from 'axios';
 
+// Only the result fields the UI renders (keeps /search responses small)
+const RESULT_FIELDS = [
+  'title',
+  'url',
+  'domain',
+  'snippet',
+  'preview_unavailable',
+  'cosine_score',
+  'tfidf_term_score',
+  'combined_score'
+];
+
 export const search = async (baseURL, { query, num_results, ranking, alpha }) => {
   const response = await axios.post(`${baseURL}/api/search`, {
     query,
     num_results,
     ranking,
-    alpha
+    alpha,
+    fields: RESULT_FIELDS
   });
   return response.data;
 };
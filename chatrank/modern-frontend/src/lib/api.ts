@@ -12,8 +12,11 @@ export function postChat(query: string) {
   return api.post('/api/chatbot', { query });
 }
 
+// Only the result fields the UI renders (keeps /search responses small)
+const RESULT_FIELDS = ['title', 'url', 'domain', 'snippet', 'cosine_score', 'tfidf_term_score', 'combined_score'];
+
 export function postSearch(query: string, num_results = 5, ranking: 'combined' | 'cosine' | 'tfidf' = 'combined') {
-  return api.post('/api/search', { query, num_results, ranking });
+  return api.post('/api/search', { query, num_results, ranking, fields: RESULT_FIELDS });
 }
 
 
@@ -3,6 +3,7 @@ const cors = require('cors');
 const dotenv = require('dotenv');
 const searchRoutes = require('./routes/search');
 const chatbotRoutes = require('./routes/chatbot');
+const rerankRoutes = require('./routes/rerank');
 
 dotenv.config();
 
@@ -22,6 +23,7 @@ app.get('/health', (req, res) => {
 // Routes
 app.use('/api/search', searchRoutes);
 app.use('/api/chatbot', chatbotRoutes);
+app.use('/api/rerank', rerankRoutes);
 
 // Error handling middleware
 app.use((err, req, res, next) => {
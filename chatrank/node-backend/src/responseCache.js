@@ -0,0 +1,98 @@
+const axios = require('axios');
+
+// In-memory cache of Python service responses, driven by their ETag and
+// Cache-Control headers. Fresh entries are served without calling the
+// service; stale ones are revalidated with If-None-Match.
+const MAX_ENTRIES = parseInt(process.env.PROXY_CACHE_MAX_ENTRIES) || 500;
+const entries = new Map();
+
+const FORWARDED_HEADERS = ['etag', 'cache-control', 'vary'];
+
+function maxAgeSeconds(cacheControl) {
+  if (!cacheControl || /no-store|no-cache|private/.test(cacheControl)) {
+    return 0;
+  }
+  const match = /max-age=(\d+)/.exec(cacheControl);
+  return match ? parseInt(match[1]) : 0;
+}
+
+function etagMatches(ifNoneMatch, etag) {
+  if (!ifNoneMatch || !etag) {
+    return false;
+  }
+  const opaque = etag.replace(/^W\//, '');
+  return ifNoneMatch.split(',').some(tag => {
+    const candidate = tag.trim();
+    return candidate === '*' || candidate.replace(/^W\//, '') === opaque;
+  });
+}
+
+function store(key, headers, body) {
+  const maxAge = maxAgeSeconds(headers['cache-control']);
+  if (!headers.etag && maxAge === 0) {
+    entries.delete(key);
+    return;
+  }
+  entries.delete(key);
+  entries.set(key, { etag: headers.etag, body, expiresAt: Date.now() + maxAge * 1000 });
+  if (entries.size > MAX_ENTRIES) {
+    // Maps iterate in insertion order: drop the oldest entry
+    entries.delete(entries.keys().next().value);
+  }
+}
+
+function send(req, res, status, headers, body) {
+  FORWARDED_HEADERS.forEach(name => {
+    if (headers[name]) {
+      res.set(name, headers[name]);
+    }
+  });
+  if (status === 304 || etagMatches(req.get('If-None-Match'), headers.etag)) {
+    return res.status(304).end();
+  }
+  return res.status(status).json(body);
+}
+
+function sendCached(req, res, entry) {
+  const remaining = Math.max(0, Math.floor((entry.expiresAt - Date.now()) / 1000));
+  return send(req, res, 200, {
+    etag: entry.etag,
+    'cache-control': remaining > 0 ? `public, max-age=${remaining}` : 'no-cache',
+    vary: 'Accept-Encoding'
+  }, entry.body);
+}
+
+// POST payload to the Python service and answer req/res, using the cache
+async function cachedPost(req, res, url, payload, options = {}) {
+  const key = `${url} ${JSON.stringify(payload)}`;
+  const cached = entries.get(key);
+  if (cached && cached.expiresAt > Date.now()) {
+    return sendCached(req, res, cached);
+  }
+
+  const headers = {};
+  const ifNoneMatch = req.get('If-None-Match') || (cached && cached.etag);
+  if (ifNoneMatch) {
+    headers['If-None-Match'] = ifNoneMatch;
+  }
+
+  const response = await axios.post(url, payload, {
+    ...options,
+    headers,
+    validateStatus: status => (status >= 200 && status < 300) || status === 304
+  });
+  const responseHeaders = response.headers || {};
+
+  if (response.status === 304) {
+    if (cached && etagMatches(cached.etag, responseHeaders.etag)) {
+      store(key, responseHeaders, cached.body);
+      return sendCached(req, res, entries.get(key) || cached);
+    }
+    return send(req, res, 304, responseHeaders);
+  }
+
+  store(key, responseHeaders, response.data);
+  return send(req, res, response.status || 200, responseHeaders, response.data);
+}
+
+module.exports = { cachedPost, maxAgeSeconds, etagMatches };
@@ -0,0 +1,78 @@
+const request = require('supertest');
+const axios = require('axios');
+const app = require('../../index');
+
+jest.mock('axios');
+
+describe('POST /api/rerank', () => {
+  beforeEach(() => {
+    jest.clearAllMocks();
+  });
+
+  it('should proxy rerank request to Python service', async () => {
+    const mockResponse = {
+      query: 'test query',
+      ai_answer: 'Test answer',
+      results: [],
+      no_results: false,
+      result_set_id: 'abc123'
+    };
+
+    axios.post.mockResolvedValue({ data: mockResponse });
+
+    const response = await request(app)
+      .post('/api/rerank')
+      .send({ result_set_id: 'abc123', ranking: 'tfidf', num_results: 3, offset: 3 })
+      .expect(200);
+
+    expect(response.body).toEqual(mockResponse);
+    expect(axios.post).toHaveBeenCalledWith(
+      expect.stringContaining('/rerank'),
+      expect.objectContaining({ result_set_id: 'abc123', ranking: 'tfidf', alpha: 0.6, num_results: 3, offset: 3 }),
+      expect.any(Object)
+    );
+  });
+
+  it('should forward alpha 0 instead of the default', async () => {
+    axios.post.mockResolvedValue({ data: { results: [] } });
+
+    await request(app)
+      .post('/api/rerank')
+      .send({ result_set_id: 'abc123', alpha: 0 })
+      .expect(200);
+
+    expect(axios.post).toHaveBeenCalledWith(
+      expect.stringContaining('/rerank'),
+      expect.objectContaining({ alpha: 0 }),
+      expect.any(Object)
+    );
+  });
+
+  it('should return 400 without a result_set_id', async () => {
+    const response = await request(app)
+      .post('/api/rerank')
+      .send({ ranking: 'combined' })
+      .expect(400);
+
+    expect(response.body.error).toBeDefined();
+    expect(axios.post).not.toHaveBeenCalled();
+  });
+
+  it('should pass on Retry-After from the Python service', async () => {
+    axios.post.mockRejectedValue({
+      response: {
+        status: 503,
+        headers: { 'retry-after': '2' },
+        data: { detail: 'Server busy' }
+      }
+    });
+
+    const response = await request(app)
+      .post('/api/rerank')
+      .send({ result_set_id: 'busy' })
+      .expect(503);
+
+    expect(response.headers['retry-after']).toBe('2');
+    expect(response.body.error).toBe('Server busy');
+  });
+});
@@ -67,5 +67,46 @@ describe('POST /api/search', () => {
 
     expect(response.body.error).toContain('not available');
   });
-});
 
+  it('should serve repeat searches from the response cache while fresh', async () => {
+    const mockResponse = { query: 'cached query', ai_answer: 'Answer', results: [], no_results: false };
+
+    axios.post.mockResolvedValue({
+      status: 200,
+      data: mockResponse,
+      headers: { etag: 'W/"abc"', 'cache-control': 'public, max-age=60' }
+    });
+
+    await request(app).post('/api/search').send({ query: 'cached query' }).expect(200);
+    const response = await request(app)
+      .post('/api/search')
+      .send({ query: 'cached query' })
+      .expect(200);
+
+    expect(response.body).toEqual(mockResponse);
+    expect(response.headers.etag).toBe('W/"abc"');
+    expect(axios.post).toHaveBeenCalledTimes(1);
+
+    await request(app)
+      .post('/api/search')
+      .set('If-None-Match', 'W/"abc"')
+      .send({ query: 'cached query' })
+      .expect(304);
+  });
+
+  it('should forward If-None-Match and 304 responses from the Python service', async () => {
+    axios.post.mockResolvedValue({ status: 304, data: '', headers: { etag: 'W/"xyz"' } });
+
+    await request(app)
+      .post('/api/search')
+      .set('If-None-Match', 'W/"xyz"')
+      .send({ query: 'uncached query' })
+      .expect(304);
+
+    expect(axios.post).toHaveBeenCalledWith(
+      expect.stringContaining('/search'),
+      expect.objectContaining({ query: 'uncached query' }),
+      expect.objectContaining({ headers: { 'If-None-Match': 'W/"xyz"' } })
+    );
+  });
+});
@@ -1,5 +1,5 @@
 const express = require('express');
-const axios = require('axios');
+const { cachedPost } = require('../responseCache');
 const router = express.Router();
 
 const PY_SERVICE_URL = process.env.PY_SERVICE_URL || 'http://localhost:8001';
@@ -12,17 +12,19 @@ router.post('/', async (req, res, next) => {
       return res.status(400).json({ error: 'Query is required and must be a non-empty string' });
     }
     
-    // Proxy to Python service
-    const response = await axios.post(`${PY_SERVICE_URL}/chatbot`, {
+    // Proxy to Python service (repeat questions may be served from the response cache)
+    await cachedPost(req, res, `${PY_SERVICE_URL}/chatbot`, {
       query: query.trim()
     }, {
       timeout: 15000 // 15 second timeout
     });
-    
-    res.json(response.data);
   } catch (error) {
     if (error.response) {
       // Python service returned an error
+      // Pass on backoff hints (load shedding, open circuit breakers)
+      if (error.response.headers && error.response.headers['retry-after']) {
+        res.set('Retry-After', error.response.headers['retry-after']);
+      }
       res.status(error.response.status).json({
         error: error.response.data.detail || error.response.data.error || 'Chatbot service error'
       });
@@ -0,0 +1,53 @@
+const express = require('express');
+const { cachedPost } = require('../responseCache');
+const router = express.Router();
+
+const PY_SERVICE_URL = process.env.PY_SERVICE_URL || 'http://localhost:8001';
+
+router.post('/', async (req, res, next) => {
+  try {
+    const {
+      result_set_id,
+      ranking = 'combined',
+      alpha = 0.6,
+      num_results = 5,
+      offset = 0,
+      fields
+    } = req.body;
+    
+    if (!result_set_id || typeof result_set_id !== 'string') {
+      return res.status(400).json({ error: 'result_set_id is required and must be a string' });
+    }
+    
+    // Proxy to Python service (only recombines stored scores, no upstream calls)
+    await cachedPost(req, res, `${PY_SERVICE_URL}/rerank`, {
+      result_set_id,
+      ranking: ranking || 'combined',
+      alpha: Number.isFinite(parseFloat(alpha)) ? parseFloat(alpha) : 0.6,
+      num_results: parseInt(num_results) || 5,
+      offset: parseInt(offset) || 0,
+      ...(Array.isArray(fields) && { fields })
+    }, {
+      timeout: 5000
+    });
+  } catch (error) {
+    if (error.response) {
+      // Python service returned an error
+      // Pass on backoff hints (load shedding, open circuit breakers)
+      if (error.response.headers && error.response.headers['retry-after']) {
+        res.set('Retry-After', error.response.headers['retry-after']);
+      }
+      res.status(error.response.status || 500).json({
+        error: error.response.data.detail || error.response.data.error || 'Rerank service error'
+      });
+    } else if (error.code === 'ECONNREFUSED') {
+      res.status(503).json({ error: 'Python service is not available. Please ensure it is running.' });
+    } else if (error.code === 'ETIMEDOUT') {
+      res.status(504).json({ error: 'Request to Python service timed out' });
+    } else {
+      next(error);
+    }
+  }
+});
+
+module.exports = router;
@@ -1,32 +1,49 @@
 const express = require('express');
-const axios = require('axios');
+const { cachedPost } = require('../responseCache');
 const router = express.Router();
 
 const PY_SERVICE_URL = process.env.PY_SERVICE_URL || 'http://localhost:8001';
 
 router.post('/', async (req, res, next) => {
   try {
-    const { query, num_results = 5, ranking = 'combined', alpha = 0.6 } = req.body;
+    const {
+      query,
+      num_results = 5,
+      ranking = 'combined',
+      alpha = 0.6,
+      offset = 0,
+      top_k,
+      result_set_id,
+      source = 'web',
+      fields
+    } = req.body;
     
     if (!query || typeof query !== 'string' || query.trim().length === 0) {
       return res.status(400).json({ error: 'Query is required and must be a non-empty string' });
     }
     
-    // Proxy to Python service
-    const response = await axios.post(`${PY_SERVICE_URL}/search`, {
+    // Proxy to Python service (repeat searches may be served from the response cache)
+    await cachedPost(req, res, `${PY_SERVICE_URL}/search`, {
       query: query.trim(),
       num_results: parseInt(num_results) || 5,
       ranking: ranking || 'combined',
-      alpha: parseFloat(alpha) || 0.6
+      alpha: Number.isFinite(parseFloat(alpha)) ? parseFloat(alpha) : 0.6,
+      offset: parseInt(offset) || 0,
+      ...(top_k && { top_k: parseInt(top_k) }),
+      ...(result_set_id && { result_set_id }),
+      source: source || 'web',
+      ...(Array.isArray(fields) && { fields })
     }, {
       timeout: 60000 // 60 second timeout (page fetching can take time)
     });
-    
-    res.json(response.data);
   } catch (error) {
     if (error.response) {
       // Python service returned an error
       const statusCode = error.response.status || 500;
+      // Pass on backoff hints (load shedding, open circuit breakers)
+      if (error.response.headers && error.response.headers['retry-after']) {
+        res.set('Retry-After', error.response.headers['retry-after']);
+      }
       const errorMessage = error.response.data.detail || error.response.data.error || 'Search service error';
       res.status(statusCode).json({
         error: errorMessage
@@ -0,0 +1,196 @@
+"""
+Admission control: bounded concurrency and queueing per endpoint, with early load shedding.
+"""
+import asyncio
+import math
+import os
+import time
+from collections import deque
+from typing import Any, Callable, Dict, Optional
+
+from fastapi.responses import JSONResponse
+
+# Max time a request may wait for a slot before it is shed (overridable per lane)
+ADMISSION_QUEUE_BUDGET_SECONDS = float(os.getenv('ADMISSION_QUEUE_BUDGET_SECONDS', 10))
+
+
+class AdmissionRejected(Exception):
+    """Raised when a request is shed instead of queued."""
+
+    def __init__(self, name: str, reason: str, retry_after: float):
+        super().__init__(f"{name} is overloaded ({reason}), please retry later")
+        self.name = name
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class AdmissionLane:
+    """
+    Concurrency limit with a bounded FIFO queue for one endpoint.
+
+    Up to max_concurrency requests run at once; up to max_queue more wait for
+    a slot. A request is shed with AdmissionRejected when the queue is full,
+    when its estimated wait (queue position over concurrency times the
+    average service time) exceeds queue_budget_seconds, or when it has
+    actually waited that long.
+
+    Lanes are used from the event loop only, so they need no locking.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        max_concurrency: int,
+        max_queue: int,
+        queue_budget_seconds: float = ADMISSION_QUEUE_BUDGET_SECONDS,
+        service_time_weight: float = 0.2,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        self.name = name
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.queue_budget_seconds = queue_budget_seconds
+        self.service_time_weight = service_time_weight
+        self.clock = clock
+
+        self.active = 0
+        self.waiters = deque()  # Futures resolved when a slot is handed over
+        self.avg_service_seconds: Optional[float] = None
+        self.max_queued = 0
+        self.admitted = 0
+        self.shed = {'queue_full': 0, 'wait_budget': 0, 'timeout': 0}
+
+    def estimated_wait(self) -> float:
+        """Expected queueing time for a request arriving now, in seconds."""
+        if self.active < self.max_concurrency and not self.waiters:
+            return 0.0
+        if self.avg_service_seconds is None:
+            return 0.0  # No samples yet: rely on the queue bound and budget
+        return (len(self.waiters) + 1) / self.max_concurrency * self.avg_service_seconds
+
+    def _reject(self, reason: str) -> AdmissionRejected:
+        self.shed[reason] += 1
+        retry_after = self.estimated_wait() or self.avg_service_seconds or 1.0
+        print(f"[ADMISSION] {self.name} shed request ({reason}), {len(self.waiters)} queued")
+        return AdmissionRejected(self.name, reason, retry_after)
+
+    async def acquire(self) -> None:
+        """Wait for a slot; raises AdmissionRejected if the request is shed."""
+        if self.active < self.max_concurrency and not self.waiters:
+            self.active += 1
+            self.admitted += 1
+            return
+        if len(self.waiters) >= self.max_queue:
+            raise self._reject('queue_full')
+        if self.estimated_wait() > self.queue_budget_seconds:
+            raise self._reject('wait_budget')
+
+        waiter = asyncio.get_running_loop().create_future()
+        self.waiters.append(waiter)
+        self.max_queued = max(self.max_queued, len(self.waiters))
+        try:
+            await asyncio.wait_for(waiter, self.queue_budget_seconds)
+        except asyncio.TimeoutError:
+            self._remove(waiter)
+            if not waiter.done() or waiter.cancelled():
+                raise self._reject('timeout')
+            # On Python 3.12+ wait_for can time out after release() already
+            # handed the slot over; take it rather than leak it
+        except asyncio.CancelledError:
+            # Client went away; pass on a slot that was already handed over
+            self._remove(waiter)
+            if waiter.done() and not waiter.cancelled():
+                self.release()
+            raise
+        self.admitted += 1
+
+    def release(self, service_seconds: Optional[float] = None) -> None:
+        """Free a slot, handing it to the next waiter, and record the service time."""
+        if service_seconds is not None:
+            if self.avg_service_seconds is None:
+                self.avg_service_seconds = service_seconds
+            else:
+                self.avg_service_seconds += self.service_time_weight * (service_seconds - self.avg_service_seconds)
+        while self.waiters:
+            waiter = self.waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)  # The slot moves to the waiter; active is unchanged
+                return
+        self.active -= 1
+
+    def _remove(self, waiter: asyncio.Future) -> None:
+        try:
+            self.waiters.remove(waiter)
+        except ValueError:
+            pass
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Current state for monitoring output."""
+        return {
+            'max_concurrency': self.max_concurrency,
+            'max_queue': self.max_queue,
+            'queue_budget_seconds': self.queue_budget_seconds,
+            'active': self.active,
+            'queued': len(self.waiters),
+            'max_queued': self.max_queued,
+            'admitted': self.admitted,
+            'shed': dict(self.shed),
+            'avg_service_seconds': round(self.avg_service_seconds, 3) if self.avg_service_seconds is not None else None,
+            'estimated_wait_seconds': round(self.estimated_wait(), 3)
+        }
+
+
+def lane_from_env(name: str, prefix: str, max_concurrency: int, max_queue: int,
+                  queue_budget_seconds: float = ADMISSION_QUEUE_BUDGET_SECONDS) -> Optional[AdmissionLane]:
+    """
+    Lane configured by ADMISSION_<prefix>_CONCURRENCY, _QUEUE and
+    _BUDGET_SECONDS, or None when its concurrency is set to 0 (no limit).
+    """
+    concurrency = int(os.getenv(f'ADMISSION_{prefix}_CONCURRENCY', max_concurrency))
+    if concurrency <= 0:
+        return None
+    return AdmissionLane(
+        name,
+        max_concurrency=concurrency,
+        max_queue=int(os.getenv(f'ADMISSION_{prefix}_QUEUE', max_queue)),
+        queue_budget_seconds=float(os.getenv(f'ADMISSION_{prefix}_BUDGET_SECONDS', queue_budget_seconds))
+    )
+
+
+class AdmissionMiddleware:
+    """
+    ASGI middleware routing POST requests for a path through its lane.
+
+    Each endpoint has its own lane, so a burst on one (e.g. /chatbot) queues
+    and sheds there without taking slots from the others. Shed requests get
+    503 with Retry-After before any work is done.
+    """
+
+    def __init__(self, app, lanes: Dict[str, AdmissionLane]):
+        self.app = app
+        self.lanes = lanes
+
+    async def __call__(self, scope, receive, send):
+        lane = None
+        if scope['type'] == 'http' and scope['method'] == 'POST':
+            lane = self.lanes.get(scope['path'])
+        if lane is None:
+            await self.app(scope, receive, send)
+            return
+
+        try:
+            await lane.acquire()
+        except AdmissionRejected as e:
+            response = JSONResponse(
+                status_code=503,
+                content={'detail': str(e)},
+                headers={'Retry-After': str(max(1, math.ceil(e.retry_after)))}
+            )
+            await response(scope, receive, send)
+            return
+
+        start = time.monotonic()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            lane.release(time.monotonic() - start)
@@ -1,26 +1,88 @@
 """
 FastAPI application for ChatRank IR microservice.
 """
+import math
 import os
+import threading
+import time
+import uuid
 from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
 from dotenv import load_dotenv
 
 # Load environment variables FIRST, before importing other modules
 load_dotenv()
 
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
-from typing import List, Optional
-from searcher import search_serpapi, extract_organic_results
-from fetcher import fetch_and_extract
-from ranker import rank_documents
-from llm import get_ai_answer, GeminiUnavailable
-from rapidfuzz import fuzz
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import FileResponse, JSONResponse, PlainTextResponse
+from pydantic import BaseModel, Field
+from typing import Any, Dict, List, Optional
+from admission import AdmissionMiddleware, lane_from_env
+from cache import cache, result_sets
+import profiling
+from profiling import ProfilingMiddleware, profiled, propagate
+from http_cache import cache_headers, content_hash, etag_matches, make_etag, not_modified
+from breaker import CircuitOpenError
+from dedup import collapse_duplicates
+from searcher import search_serpapi, extract_organic_results, serpapi_breaker, serpapi_cache_key
+from fetcher import fetch_and_extract, get_fetch_stats, shutdown_extraction_pool
+from ranker import compute_score_vectors, rank_by_scores, rank_documents
+from local_index import get_local_index
+from llm import get_ai_answer, gemini_breaker, load_gemini_client, GeminiTimeout, GeminiUnavailable
 
-app = FastAPI(title="ChatRank IR Service", version="1.0.0")
+# orjson is much faster than the stdlib json encoder; fall back if it's missing
+try:
+    import orjson  # noqa: F401
+    from fastapi.responses import ORJSONResponse as FastJSONResponse
+except ImportError:
+    FastJSONResponse = JSONResponse
 
-# CORS middleware
+app = FastAPI(title="ChatRank IR Service", version="1.0.0", default_response_class=FastJSONResponse)
+
+# Upper bound on candidates fetched and ranked for a single query
+MAX_TOP_K = int(os.getenv('MAX_TOP_K', 300))
+
+# Import heavy dependencies in the background after startup (0 = load on first use)
+WARMUP_ON_STARTUP = os.getenv('WARMUP_ON_STARTUP', '1') != '0'
+
+# Set once warm-up has finished; reported by /ready
+service_ready = threading.Event()
+warmup_status = {'seconds': None, 'errors': []}
+
+# Collapse near-duplicate candidates before ranking (0 = off)
+DEDUP_RESULTS = os.getenv('DEDUP_RESULTS', '1') != '0'
+
+# Gzip responses larger than this many bytes (0 = compression off)
+RESPONSE_GZIP_MIN_BYTES = int(os.getenv('RESPONSE_GZIP_MIN_BYTES', 0))
+
+# Thread pool for ranking, shared so the ranking timeout doesn't wait on a per-request pool
+ranking_executor = ThreadPoolExecutor(
+    max_workers=int(os.getenv('RANKING_WORKERS', 4)),
+    thread_name_prefix="ranking"
+)
+
+# Admission control: each endpoint has its own lane (concurrency, queue), so
+# bursts on one are queued or shed without starving the others. The blocking
+# handlers run in Starlette's thread pool (40 threads), so the lanes' combined
+# concurrency should stay below that.
+admission_lanes = {
+    path: lane
+    for path, lane in (
+        ('/search', lane_from_env('search', 'SEARCH', max_concurrency=8, max_queue=32)),
+        ('/chatbot', lane_from_env('chatbot', 'CHATBOT', max_concurrency=4, max_queue=16,
+                                   queue_budget_seconds=5)),
+        ('/search-simple', lane_from_env('search-simple', 'SIMPLE', max_concurrency=2, max_queue=8))
+    )
+    if lane is not None
+}
+app.add_middleware(AdmissionMiddleware, lanes=admission_lanes)
+
+# Opt-in request profiling (X-Profile header); not installed unless enabled
+if profiling.PROFILING_ENABLED:
+    app.add_middleware(ProfilingMiddleware, paths=['/search', '/search-simple', '/chatbot'])
+
+# CORS middleware (added last so it also applies to shed requests)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],  # In production, specify frontend URL
@@ -29,21 +91,59 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+if RESPONSE_GZIP_MIN_BYTES > 0:
+    app.add_middleware(GZipMiddleware, minimum_size=RESPONSE_GZIP_MIN_BYTES)
+
 class SearchRequest(BaseModel):
     query: str
-    num_results: int = 5
+    num_results: int = Field(5, ge=1, le=MAX_TOP_K)  # Page size
     ranking: str = "combined"  # "combined", "cosine", "tfidf"
     alpha: float = 0.6
+    offset: int = Field(0, ge=0)
+    top_k: Optional[int] = Field(None, ge=1, le=MAX_TOP_K)  # Candidates to rank (default: offset + num_results)
+    result_set_id: Optional[str] = None  # Page through a previously ranked set
+    source: str = "web"  # "web" (SerpApi) or "local" (local corpus index)
+    fields: Optional[List[str]] = None  # Result fields to return (default: all of RESULT_FIELDS)
+
+class RerankRequest(BaseModel):
+    result_set_id: str  # From a previous /search response
+    ranking: str = "combined"  # "combined", "cosine", "tfidf"
+    alpha: float = 0.6
+    num_results: int = Field(5, ge=1, le=MAX_TOP_K)
+    offset: int = Field(0, ge=0)
+    fields: Optional[List[str]] = None
 
 class ChatbotRequest(BaseModel):
     query: str
 
+# Fields a search result can carry, in response order
+RESULT_FIELDS = (
+    'title', 'url', 'domain', 'snippet', 'text', 'preview_unavailable', 'raw_meta',
+    'cosine_score', 'tfidf_term_score', 'combined_score', 'duplicates'
+)
+
+class SearchResult(BaseModel):
+    title: Optional[str] = None
+    url: Optional[str] = None
+    domain: Optional[str] = None
+    snippet: Optional[str] = None
+    text: Optional[str] = None
+    preview_unavailable: Optional[bool] = None
+    raw_meta: Optional[Dict[str, Any]] = None
+    cosine_score: Optional[float] = None
+    tfidf_term_score: Optional[float] = None
+    combined_score: Optional[float] = None
+    duplicates: Optional[List[Dict[str, Any]]] = None  # Near-duplicates collapsed into this result
+
 class SearchResponse(BaseModel):
     query: str
     ai_answer: str
-    results: List[dict]
+    results: List[SearchResult]
     no_results: bool = False
     spelling_suggestion: Optional[str] = None
+    result_set_id: Optional[str] = None
+    total_results: int = 0
+    offset: int = 0
 
 class ChatbotResponse(BaseModel):
     query: str
@@ -54,6 +154,8 @@ def check_spelling(query: str) -> Optional[str]:
     Simple spelling check using rapidfuzz.
     Returns suggested correction if query seems misspelled.
     """
+    from rapidfuzz import fuzz
+    
     # Common corrections dictionary (simplified)
     common_queries = [
         "machine learning applications",
@@ -106,13 +208,193 @@ def generate_summary_from_results(query: str, results: List[dict], reason: Optio
 
     return summary
 
+def retry_after_header(retry_after: float) -> dict:
+    """Retry-After header for a short-circuited upstream."""
+    return {"Retry-After": str(max(1, math.ceil(retry_after)))}
+
+def select_fields(results: List[dict], fields: Optional[List[str]]) -> List[dict]:
+    """Project results down to the requested fields (all fields if None)."""
+    if fields is None:
+        return results
+    return [{field: result[field] for field in fields if field in result} for result in results]
+
+def search_response(response_data: dict, headers: Optional[dict] = None) -> FastJSONResponse:
+    """
+    Serialize a search response directly.
+    
+    Results are built by this service (already shaped like SearchResult), so
+    re-validating them through the response model is skipped: returning a
+    Response bypasses FastAPI's response_model, so response_model=SearchResponse
+    on the routes only documents the shape in the OpenAPI schema.
+    """
+    return FastJSONResponse(content=response_data, headers=headers)
+
+def validate_fields(fields: Optional[List[str]]) -> None:
+    """Reject result fields that don't exist and empty field lists."""
+    if fields is None:
+        return
+    if not fields:
+        raise HTTPException(
+            status_code=400,
+            detail=f"fields must name at least one result field (omit it for all). Available: {', '.join(RESULT_FIELDS)}"
+        )
+    unknown = [field for field in fields if field not in RESULT_FIELDS]
+    if unknown:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown result fields: {', '.join(unknown)}. Available: {', '.join(RESULT_FIELDS)}"
+        )
+
+def ranking_alpha(ranking: str, alpha: float) -> float:
+    """Effective alpha for a ranking mode."""
+    return alpha if ranking == "combined" else (1.0 if ranking == "cosine" else 0.0)
+
+def rank_result_set(result_set: dict, alpha: float, limit: int) -> List[dict]:
+    """
+    The best `limit` results of a stored result set for alpha.
+    
+    Combines the stored score vectors, so no refitting is needed. Sets whose
+    ranking failed have no vectors and keep their original order.
+    """
+    limit = min(limit, result_set['top_k'])
+    if result_set['cosine_scores'] is None:
+        return result_set['candidates'][:limit]
+    return rank_by_scores(result_set['candidates'], result_set['cosine_scores'], result_set['tfidf_scores'],
+                          alpha, limit, copy=True)
+
+def build_page_response(result_set_id: str, result_set: dict, alpha: float, offset: int, num_results: int,
+                        fields: Optional[List[str]] = None, headers: Optional[dict] = None) -> FastJSONResponse:
+    """Rank a stored result set for alpha and slice one page out of it."""
+    page = rank_result_set(result_set, alpha, offset + num_results)[offset:]
+    return search_response({
+        'query': result_set['query'],
+        'ai_answer': result_set['ai_answer'],
+        'results': select_fields(page, fields),
+        'no_results': False,
+        'spelling_suggestion': result_set.get('spelling_suggestion'),
+        'result_set_id': result_set_id,
+        'total_results': min(len(result_set['candidates']), result_set['top_k']),
+        'offset': offset
+    }, headers)
+
+def search_cache_inputs(query: str, source: str, top_k: int) -> Optional[dict]:
+    """
+    Identify the cached inputs a /search response is built from.
+    
+    Returns None unless both the candidates (SerpApi response or local index)
+    and the Gemini answer are cached. Otherwise returns the 'key' that
+    determines the result set (candidates and their score vectors, which do
+    not depend on alpha) and the 'max_age' it stays valid for.
+    """
+    gemini = cache.peek('gemini', query)
+    if gemini is None:
+        return None
+    if source == "local":
+        try:
+            index = get_local_index()
+        except (ValueError, OSError):
+            return None
+        # The build id changes when the index is rebuilt, even in place
+        candidates = {'timestamp': index.build_id, 'expires_in': gemini['expires_in']}
+    else:
+        candidates = cache.peek('serpapi', serpapi_cache_key(query, top_k))
+        if candidates is None:
+            return None
+    return {
+        'key': {
+            'query': query.lower(),
+            'source': source,
+            'top_k': top_k,
+            'candidates': candidates['timestamp'],
+            'gemini': gemini['timestamp']
+        },
+        'max_age': min(candidates['expires_in'], gemini['expires_in'], result_sets.ttl_seconds)
+    }
+
+def page_etag(result_set_id: str, alpha: float, offset: int, num_results: int,
+              fields: Optional[List[str]]) -> str:
+    """ETag of one page of a result set ranked for alpha."""
+    return make_etag('search', result_set_id, alpha, offset, num_results, fields)
+
+def serve_result_set_page(result_set_id: str, alpha: float, offset: int, num_results: int,
+                          fields: Optional[List[str]], if_none_match: Optional[str]) -> Response:
+    """Answer with one page of a stored result set: no SerpApi, fitting or Gemini work."""
+    stored = result_sets.peek('result_set', result_set_id)
+    result_set = result_sets.get('result_set', result_set_id)
+    if result_set is None or stored is None:
+        raise HTTPException(
+            status_code=404,
+            detail="Result set not found or expired. Please run the search again."
+        )
+    headers = cache_headers(page_etag(result_set_id, alpha, offset, num_results, fields), stored['expires_in'])
+    if etag_matches(if_none_match, headers['ETag']):
+        return not_modified(headers)
+    return build_page_response(result_set_id, result_set, alpha, offset, num_results, fields, headers)
+
+def warm_up():
+    """Load heavy dependencies (scikit-learn, rapidfuzz, Gemini SDK) and exercise the ranking path once."""
+    start = time.perf_counter()
+    steps = [
+        ('ranker', lambda: rank_documents("warm up", [{'text': 'warm up ranking'}, {'text': 'second document'}])),
+        ('spelling', lambda: check_spelling("warm up")),
+        ('gemini', load_gemini_client)
+    ]
+    for name, step in steps:
+        try:
+            step()
+        except Exception as e:
+            warmup_status['errors'].append(f"{name}: {str(e)}")
+            print(f"[WARMUP] {name} failed: {e}")
+    warmup_status['seconds'] = round(time.perf_counter() - start, 3)
+    service_ready.set()
+    print(f"[WARMUP] Ready after {warmup_status['seconds']}s")
+
+@app.on_event("startup")
+def start_warm_up():
+    """Start warm-up in the background so /health answers immediately."""
+    if WARMUP_ON_STARTUP:
+        threading.Thread(target=warm_up, name="warm-up", daemon=True).start()
+    else:
+        service_ready.set()
+
+@app.on_event("shutdown")
+def shutdown_workers():
+    """Stop background worker processes."""
+    shutdown_extraction_pool()
+    ranking_executor.shutdown(wait=False, cancel_futures=True)
+
 @app.get("/health")
 async def health_check():
-    """Health check endpoint."""
-    return {"status": "healthy", "service": "chatrank-ir"}
+    """Liveness check: answers as soon as the server is up."""
+    return {
+        "status": "healthy",
+        "service": "chatrank-ir",
+        "upstreams": {
+            "gemini": gemini_breaker.snapshot(),
+            "serpapi": serpapi_breaker.snapshot()
+        }
+    }
+
+@app.get("/ready")
+async def readiness_check():
+    """Readiness check: 503 until heavy dependencies have been loaded."""
+    if not service_ready.is_set():
+        return JSONResponse(status_code=503, content={"status": "warming_up", "service": "chatrank-ir"})
+    return {"status": "ready", "service": "chatrank-ir", "warmup": warmup_status}
+
+@app.get("/metrics/admission")
+async def admission_metrics():
+    """Concurrency, queue depth and shed counts of each admission lane."""
+    return {path: lane.snapshot() for path, lane in admission_lanes.items()}
+
+@app.get("/metrics/fetcher")
+async def fetcher_metrics():
+    """Page downloads, conditional revalidation savings and parse time."""
+    return get_fetch_stats()
 
 @app.post("/search-simple")
-async def search_simple(request: SearchRequest):
+@profiled
+def search_simple(request: SearchRequest):
     """Simplified search endpoint for debugging - returns SerpApi results only."""
     try:
         print(f"[SIMPLE] Starting simple search: {request.query}")
@@ -120,7 +402,7 @@ async def search_simple(request: SearchRequest):
         
         # Fetch from SerpApi
         serpapi_response = search_serpapi(query, request.num_results)
-        organic_results = extract_organic_results(serpapi_response)
+        organic_results = extract_organic_results(serpapi_response)[:request.num_results]
         
         # Return simple results
         results = []
@@ -141,49 +423,104 @@ async def search_simple(request: SearchRequest):
             'results': results,
             'no_results': len(results) == 0
         }
+    except CircuitOpenError as e:
+        raise HTTPException(status_code=503, detail=str(e), headers=retry_after_header(e.retry_after))
     except Exception as e:
         print(f"[SIMPLE] Error: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.post("/search", response_model=SearchResponse)
-async def search(request: SearchRequest):
+@profiled
+def search(request: SearchRequest, http_request: Request):
     """
     Main search endpoint: fetches results, extracts content, ranks, and returns.
     """
     try:
+        validate_fields(request.fields)
+        
+        if_none_match = http_request.headers.get('if-none-match')
+        alpha = ranking_alpha(request.ranking, request.alpha)
+        
+        if request.result_set_id:
+            # Later page of an already ranked set
+            print(f"[SEARCH] Serving page at offset {request.offset} from result set {request.result_set_id}")
+            return serve_result_set_page(request.result_set_id, alpha, request.offset, request.num_results,
+                                         request.fields, if_none_match)
+        
         print(f"[SEARCH] ===== NEW REQUEST: {request.query} =====")
         query = request.query.strip()
         if not query:
             raise HTTPException(status_code=400, detail="Query cannot be empty")
         
+        # Number of candidates to fetch and rank
+        top_k = min(request.top_k or request.offset + request.num_results, MAX_TOP_K)
+        
+        # Repeat of a search whose inputs are all cached (with any alpha):
+        # answer 304, or rank the stored set, without fitting again
+        inputs = search_cache_inputs(query, request.source, top_k)
+        if inputs is not None:
+            result_set_id = content_hash(inputs['key'])
+            headers = cache_headers(
+                page_etag(result_set_id, alpha, request.offset, request.num_results, request.fields),
+                inputs['max_age']
+            )
+            if etag_matches(if_none_match, headers['ETag']):
+                print(f"[SEARCH] Not modified")
+                return not_modified(headers)
+            result_set = result_sets.get('result_set', result_set_id)
+            if result_set is not None:
+                return build_page_response(result_set_id, result_set, alpha, request.offset, request.num_results,
+                                           request.fields, headers)
+        
         # Check spelling
         print(f"[SEARCH] Checking spelling...")
         spelling_suggestion = check_spelling(query)
         
-        # Fetch from SerpApi
-        try:
-            print(f"[SEARCH] Calling SerpApi...")
-            serpapi_response = search_serpapi(query, request.num_results)
-            print(f"[SEARCH] SerpApi returned successfully")
-        except ValueError as e:
-            error_msg = str(e)
-            if "SERPAPI_KEY" in error_msg or "GEMINI_API_KEY" in error_msg:
+        if request.source == "local":
+            # Answer from the local corpus index instead of SerpApi
+            try:
+                print(f"[SEARCH] Searching local index...")
+                organic_results = get_local_index().search(query, top_k)
+            except ValueError as e:
                 raise HTTPException(
-                    status_code=503, 
-                    detail=f"Service configuration error: {error_msg}. Please check your .env file and ensure API keys are set."
+                    status_code=503,
+                    detail=f"Local search unavailable: {str(e)}. Build an index with local_index.py and set LOCAL_INDEX_DIR."
                 )
-            raise HTTPException(status_code=400, detail=error_msg)
-        except Exception as e:
-            error_msg = str(e)
-            if "rate limit" in error_msg.lower():
-                raise HTTPException(status_code=429, detail=error_msg)
-            raise HTTPException(status_code=500, detail=f"Search failed: {error_msg}")
-        
-        # Extract organic results
-        print(f"[SEARCH] Extracting organic results...")
-        organic_results = extract_organic_results(serpapi_response)
+            except OSError as e:
+                raise HTTPException(status_code=503, detail=f"Local search unavailable: {str(e)}")
+        elif request.source == "web":
+            # Fetch from SerpApi
+            try:
+                print(f"[SEARCH] Calling SerpApi...")
+                serpapi_response = search_serpapi(query, top_k)
+                print(f"[SEARCH] SerpApi returned successfully")
+            except ValueError as e:
+                error_msg = str(e)
+                if "SERPAPI_KEY" in error_msg or "GEMINI_API_KEY" in error_msg:
+                    raise HTTPException(
+                        status_code=503, 
+                        detail=f"Service configuration error: {error_msg}. Please check your .env file and ensure API keys are set."
+                    )
+                raise HTTPException(status_code=400, detail=error_msg)
+            except CircuitOpenError as e:
+                raise HTTPException(status_code=503, detail=str(e), headers=retry_after_header(e.retry_after))
+            except Exception as e:
+                error_msg = str(e)
+                if "rate limit" in error_msg.lower():
+                    raise HTTPException(status_code=429, detail=error_msg)
+                raise HTTPException(status_code=500, detail=f"Search failed: {error_msg}")
+            
+            # Extract organic results
+            print(f"[SEARCH] Extracting organic results...")
+            organic_results = extract_organic_results(serpapi_response)
+        else:
+            raise HTTPException(status_code=400, detail=f"Unknown source: {request.source}")
         print(f"[SEARCH] Found {len(organic_results)} organic results")
         
+        if DEDUP_RESULTS:
+            # Mirrors and syndicated copies are collapsed, so they aren't ranked
+            organic_results = collapse_duplicates(organic_results)
+        
         if not organic_results:
             # No results, return AI answer only
             try:
@@ -197,12 +534,16 @@ async def search(request: SearchRequest):
             except Exception as e:
                 ai_answer = f"Unable to generate AI answer: {str(e)}"
             
-            return SearchResponse(
-                query=query,
-                ai_answer=ai_answer,
-                results=[],
-                no_results=True
-            )
+            return search_response({
+                'query': query,
+                'ai_answer': ai_answer,
+                'results': [],
+                'no_results': True,
+                'spelling_suggestion': spelling_suggestion,
+                'result_set_id': None,
+                'total_results': 0,
+                'offset': request.offset
+            }, cache_headers(None, None))
         
         # Fetch and extract content for each URL (with aggressive timeout protection)
         # Use SerpApi snippets as primary content, fetch full text only if fast
@@ -217,9 +558,10 @@ async def search(request: SearchRequest):
                 'url': item['url'],
                 'domain': item['domain'],
                 'snippet': item.get('snippet', ''),
-                'text': None,  # Will be filled if fetch succeeds quickly
+                'text': item.get('text'),  # Full text for local results; filled if fetch succeeds quickly
                 'preview_unavailable': False,
-                'raw_meta': item.get('raw_meta', {})
+                'raw_meta': item.get('raw_meta', {}),
+                'duplicates': item.get('duplicates', [])
             }
             results.append(result)
         
@@ -234,36 +576,44 @@ async def search(request: SearchRequest):
             if not result.get('text') and result.get('snippet'):
                 result['text'] = result['snippet']  # Use snippet for ranking if no full text
 
-        # Rank documents (this should be fast with snippets)
+        # Rank documents (this should be fast with snippets). Only the score
+        # vectors are computed here; they are combined for alpha per page.
         print(f"[SEARCH] Ranking documents with {len(results)} results...")
-        alpha = request.alpha if request.ranking == "combined" else (1.0 if request.ranking == "cosine" else 0.0)
+        # Degraded responses (ranking or Gemini failures) are never reused
+        cacheable = True
+        cosine_scores = tfidf_scores = None
         try:
-            with ThreadPoolExecutor() as executor:
-                future = executor.submit(rank_documents, query, results, alpha)
-                ranked_results = future.result(timeout=5)  # 5 second timeout for ranking
-            print(f"[SEARCH] Ranking complete, {len(ranked_results)} results")
+            future = ranking_executor.submit(propagate(compute_score_vectors), query, results)
+            cosine_scores, tfidf_scores = future.result(timeout=5)  # 5 second timeout for ranking
+            print(f"[SEARCH] Ranking complete, {len(results)} results")
         except FutureTimeoutError:
             print(f"[SEARCH] Ranking timed out, using original order")
-            ranked_results = results
+            cacheable = False
         except Exception as e:
             print(f"[SEARCH] Ranking failed: {str(e)}")
             # If ranking fails, just return results in original order
-            ranked_results = results
+            cacheable = False
+
+        result_set = {
+            'query': query,
+            'ai_answer': None,
+            'candidates': results,
+            'cosine_scores': cosine_scores,
+            'tfidf_scores': tfidf_scores,
+            'top_k': top_k,
+            'spelling_suggestion': spelling_suggestion
+        }
 
         print(f"[SEARCH] Getting AI answer...")
         ai_answer = None
         ai_error = None
 
-        def fetch_ai_answer():
-            return get_ai_answer(query)
-
         try:
-            with ThreadPoolExecutor() as executor:
-                future = executor.submit(fetch_ai_answer)
-                ai_answer = future.result(timeout=5)
+            # Bounded by the Gemini breaker's adaptive timeout; fails fast while it is open
+            ai_answer = get_ai_answer(query)
             print(f"[SEARCH] AI answer received")
-        except FutureTimeoutError:
-            ai_error = "Gemini request timed out after 5 seconds."
+        except GeminiTimeout:
+            ai_error = "Gemini request timed out."
             print(f"[SEARCH] AI answer timed out")
         except GeminiUnavailable as e:
             ai_error = "Gemini service was unavailable."
@@ -273,30 +623,62 @@ async def search(request: SearchRequest):
             print(f"[SEARCH] AI answer failed: {e}")
 
         if not ai_answer:
-            ai_answer = generate_summary_from_results(query, ranked_results, ai_error)
+            ai_answer = generate_summary_from_results(query, rank_result_set(result_set, alpha, top_k), ai_error)
+            cacheable = False
 
         print(f"[SEARCH] Preparing response...")
 
-        # Add spelling suggestion if available
-        response_data = {
-            'query': query,
-            'ai_answer': ai_answer,
-            'results': ranked_results,
-            'no_results': False
-        }
-
-        if spelling_suggestion:
-            response_data['spelling_suggestion'] = spelling_suggestion
+        # Keep the candidates and their score vectors so later pages, repeats
+        # of this search and /rerank are served without fitting again. The id
+        # is derived from the cached inputs, so identical searches map to the
+        # same set and ETag.
+        inputs = search_cache_inputs(query, request.source, top_k) if cacheable else None
+        if inputs is not None:
+            result_set_id = content_hash(inputs['key'])
+            headers = cache_headers(
+                page_etag(result_set_id, alpha, request.offset, request.num_results, request.fields),
+                inputs['max_age']
+            )
+        else:
+            result_set_id = uuid.uuid4().hex
+            headers = cache_headers(None, None)
+        result_set['ai_answer'] = ai_answer
+        result_sets.set('result_set', result_set_id, result_set)
 
-        return SearchResponse(**response_data)
+        if 'ETag' in headers and etag_matches(if_none_match, headers['ETag']):
+            return not_modified(headers)
+        return build_page_response(result_set_id, result_set, alpha, request.offset, request.num_results,
+                                   request.fields, headers)
     
     except HTTPException:
         raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
 
+@app.post("/rerank", response_model=SearchResponse)
+async def rerank(request: RerankRequest, http_request: Request):
+    """
+    Re-rank a previous /search result set for a new ranking mode or alpha.
+    
+    Recombines the stored cosine and TF-IDF score vectors: no SerpApi,
+    vectorizer fitting or Gemini work.
+    """
+    validate_fields(request.fields)
+    alpha = ranking_alpha(request.ranking, request.alpha)
+    print(f"[RERANK] Result set {request.result_set_id} with alpha {alpha}")
+    return serve_result_set_page(request.result_set_id, alpha, request.offset, request.num_results,
+                                 request.fields, http_request.headers.get('if-none-match'))
+
+def chatbot_cache_headers(query: str) -> dict:
+    """Validators for a /chatbot answer, derived from the cached Gemini entry."""
+    gemini = cache.peek('gemini', query)
+    if gemini is None:
+        return cache_headers(None, None)
+    return cache_headers(make_etag('chatbot', query.lower(), gemini['timestamp']), gemini['expires_in'])
+
 @app.post("/chatbot", response_model=ChatbotResponse)
-async def chatbot(request: ChatbotRequest):
+@profiled
+def chatbot(request: ChatbotRequest, http_request: Request, response: Response):
     """
     Chatbot endpoint: returns AI answer for query.
     """
@@ -305,8 +687,13 @@ async def chatbot(request: ChatbotRequest):
         if not query:
             raise HTTPException(status_code=400, detail="Query cannot be empty")
         
+        headers = chatbot_cache_headers(query)
+        if 'ETag' in headers and etag_matches(http_request.headers.get('if-none-match'), headers['ETag']):
+            return not_modified(headers)
+        
         answer = get_ai_answer(query)
 
+        response.headers.update(chatbot_cache_headers(query))
         return ChatbotResponse(query=query, answer=answer)
 
     except ValueError as e:
@@ -318,10 +705,75 @@ async def chatbot(request: ChatbotRequest):
             )
         raise HTTPException(status_code=400, detail=error_msg)
     except GeminiUnavailable as e:
-        raise HTTPException(status_code=503, detail=f"Gemini unavailable: {str(e)}")
+        headers = retry_after_header(e.retry_after) if e.retry_after else None
+        raise HTTPException(status_code=503, detail=f"Gemini unavailable: {str(e)}", headers=headers)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to get AI answer: {str(e)}")
 
+def require_profiling(http_request: Request) -> None:
+    """Debug endpoints only exist when profiling is enabled (and the token matches, if set)."""
+    if not profiling.PROFILING_ENABLED:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if not profiling.check_token(http_request.headers.get('x-profile-token')):
+        raise HTTPException(status_code=403, detail="Invalid or missing X-Profile-Token")
+
+@app.get("/debug/profiles")
+def list_request_profiles(http_request: Request):
+    """Stored request profiles, newest first."""
+    require_profiling(http_request)
+    return [
+        {'id': info['id'], 'file': os.path.basename(info['path']), 'bytes': info['bytes'], 'created': info['created']}
+        for info in profiling.list_profiles()
+    ]
+
+@app.get("/debug/profiles/{profile_id}")
+def download_request_profile(profile_id: str, http_request: Request):
+    """Download a profile file (.prof pstats or .folded collapsed stacks)."""
+    require_profiling(http_request)
+    path = profiling.find_profile(profile_id)
+    if path is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return FileResponse(path, filename=os.path.basename(path), media_type='application/octet-stream')
+
+@app.get("/debug/profiles/{profile_id}/summary")
+def request_profile_summary(profile_id: str, http_request: Request, sort: str = "cumulative", limit: int = 30):
+    """Top functions of a cProfile profile as text."""
+    require_profiling(http_request)
+    path = profiling.find_profile(profile_id)
+    if path is None or not path.endswith('.prof'):
+        raise HTTPException(status_code=404, detail="cProfile profile not found")
+    try:
+        return PlainTextResponse(profiling.profile_summary(path, sort, limit))
+    except KeyError:
+        raise HTTPException(status_code=400, detail=f"Unknown sort key: {sort}")
+
+@app.post("/debug/tracemalloc/start")
+def start_tracemalloc(http_request: Request, frames: int = 1):
+    """Start tracing allocations (adds overhead to every allocation until stopped)."""
+    require_profiling(http_request)
+    profiling.start_tracemalloc(max(1, frames))
+    return {'tracing': True}
+
+@app.post("/debug/tracemalloc/stop")
+def stop_tracemalloc(http_request: Request):
+    require_profiling(http_request)
+    profiling.stop_tracemalloc()
+    return {'tracing': False}
+
+@app.get("/debug/memory")
+def memory_snapshot(http_request: Request, limit: int = 20, group_by: str = "lineno"):
+    """Memory per cache prefix, plus top allocation sites while tracemalloc is running."""
+    require_profiling(http_request)
+    if group_by not in ('lineno', 'filename', 'traceback'):
+        raise HTTPException(status_code=400, detail="group_by must be lineno, filename or traceback")
+    return {
+        'caches': {
+            'cache': profiling.cache_memory(cache),
+            'result_sets': profiling.cache_memory(result_sets)
+        },
+        'tracemalloc': profiling.tracemalloc_report(limit, group_by)
+    }
+
 if __name__ == "__main__":
     import uvicorn
     port = int(os.getenv('PORT', 8001))
@@ -0,0 +1,88 @@
+"""
+Import-time benchmark: startup cost of each service module.
+
+Usage:
+    python benchmarks/bench_import_time.py [--runs 5] [module ...]
+
+Each module is imported in a fresh interpreter with `python -X importtime`;
+the median cumulative import time over --runs runs is reported. Heavy
+dependencies that the service loads lazily are listed separately, so the
+cost moved out of startup (into warm-up) stays visible.
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+SERVICE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SERVICE_MODULES = [
+    'app', 'cache', 'breaker', 'admission', 'profiling', 'dedup', 'searcher', 'fetcher', 'ranker', 'llm', 'local_index'
+]
+LAZY_DEPENDENCIES = [
+    'sklearn.feature_extraction.text',
+    'sklearn.metrics.pairwise',
+    'rapidfuzz',
+    'google.generativeai',
+    'bs4',
+    'newspaper'
+]
+
+
+def _top_level_imports(code: str):
+    """Run code with -X importtime; yield (name, cumulative_us) of top-level imports."""
+    proc = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', code],
+        cwd=SERVICE_DIR, capture_output=True, text=True
+    )
+    if proc.returncode != 0:
+        raise ImportError(proc.stderr.strip().splitlines()[-1] if proc.stderr.strip() else code)
+    for line in proc.stderr.splitlines():
+        if not line.startswith('import time:'):
+            continue
+        _, cumulative_us, name = line[len('import time:'):].split('|')
+        # Nested imports are indented below their importer
+        if name.startswith(' ') and not name.startswith('  ') and cumulative_us.strip().isdigit():
+            yield name.strip(), int(cumulative_us)
+
+
+# Modules the interpreter imports at startup regardless of the code run
+BASELINE = {name for name, _ in _top_level_imports('pass')}
+
+
+def import_time_ms(module: str) -> float:
+    """Total import time caused by importing a module in a fresh interpreter (ms), or -1 if it fails."""
+    try:
+        return sum(
+            us for name, us in _top_level_imports(f'import {module}') if name not in BASELINE
+        ) / 1000.0
+    except ImportError:
+        return -1.0
+
+
+def measure(modules, runs: int) -> None:
+    for module in modules:
+        samples = [import_time_ms(module) for _ in range(runs)]
+        if any(s < 0 for s in samples):
+            print(f"  {module:<34} not importable")
+            continue
+        print(f"  {module:<34} {statistics.median(samples):9.1f} ms  (min {min(samples):.1f})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('modules', nargs='*', help="Modules to measure (default: all service modules)")
+    args = parser.parse_args()
+
+    print(f"Median cumulative import time over {args.runs} runs")
+    print("Service modules:")
+    measure(args.modules or SERVICE_MODULES, args.runs)
+    if not args.modules:
+        print("Lazily loaded dependencies (paid during warm-up, not startup):")
+        measure(LAZY_DEPENDENCIES, args.runs)
+
+
+if __name__ == '__main__':
+    main()
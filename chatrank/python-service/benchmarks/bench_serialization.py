@@ -0,0 +1,98 @@
+"""
+Serialization benchmark for /search responses: bytes per response and encode time.
+
+Usage:
+    python benchmarks/bench_serialization.py [--results 10] [--text-kb 20] [--iterations 200]
+
+Compares the previous path (validate through the pydantic response model,
+then FastAPI's jsonable_encoder + stdlib json) against the lean path
+(field selection + direct orjson encoding, as in app.search_response), with
+and without gzip.
+"""
+import argparse
+import gzip
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi.encoders import jsonable_encoder  # noqa: E402
+
+from app import FastJSONResponse, SearchResponse, select_fields  # noqa: E402
+
+LEAN_FIELDS = ['title', 'url', 'domain', 'snippet', 'combined_score']
+
+
+def make_response(num_results: int, text_kb: int) -> dict:
+    text = ("machine learning systems learn patterns from data " * (text_kb * 20))[:text_kb * 1024]
+    results = []
+    for i in range(num_results):
+        results.append({
+            'title': f"Result {i}: machine learning applications",
+            'url': f"https://example.com/articles/{i}",
+            'domain': "example.com",
+            'snippet': "Machine learning is used in search, recommendations and more...",
+            'text': text,
+            'preview_unavailable': False,
+            'raw_meta': {'position': i + 1, 'date': '', 'source': 'Example'},
+            'cosine_score': 0.8123,
+            'tfidf_term_score': 0.6712,
+            'combined_score': 0.7558
+        })
+    return {
+        'query': "machine learning applications",
+        'ai_answer': "Machine learning applications include... " * 10,
+        'results': results,
+        'no_results': False,
+        'spelling_suggestion': None,
+        'result_set_id': "0123456789abcdef0123456789abcdef",
+        'total_results': num_results,
+        'offset': 0
+    }
+
+
+def model_path(data: dict) -> bytes:
+    """Previous behaviour: response_model validation + jsonable_encoder + json."""
+    model = SearchResponse(**data)
+    return json.dumps(jsonable_encoder(model), ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+def lean_path(data: dict, fields) -> bytes:
+    """Current behaviour: field selection + direct encoding."""
+    payload = dict(data, results=select_fields(data['results'], fields))
+    return FastJSONResponse(content=payload).body
+
+
+def timed(fn, iterations: int):
+    body = fn()
+    start = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    return body, (time.perf_counter() - start) / iterations * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--results', type=int, default=10)
+    parser.add_argument('--text-kb', type=int, default=20, help="Size of each result's 'text' field")
+    parser.add_argument('--iterations', type=int, default=200)
+    args = parser.parse_args()
+
+    data = make_response(args.results, args.text_kb)
+    print(f"{args.results} results, {args.text_kb} KiB text each, encoder: {FastJSONResponse.__name__}")
+    print(f"{'path':<36} {'bytes':>10} {'gzip bytes':>11} {'ms/response':>12}")
+
+    cases = [
+        ("response_model + json (before)", lambda: model_path(data)),
+        ("all fields, direct encoding", lambda: lean_path(data, None)),
+        (f"fields={','.join(LEAN_FIELDS)}", lambda: lean_path(data, LEAN_FIELDS)),
+    ]
+    for label, fn in cases:
+        body, ms = timed(fn, args.iterations)
+        print(f"{label[:36]:<36} {len(body):>10} {len(gzip.compress(body)):>11} {ms:>12.3f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,214 @@
+"""
+Circuit breakers and adaptive timeouts for upstream APIs (Gemini, SerpApi).
+"""
+import math
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from typing import Any, Callable, Dict, Optional
+
+from profiling import propagate
+
+# Defaults shared by all breakers (overridable per breaker)
+BREAKER_FAILURE_RATE = float(os.getenv('BREAKER_FAILURE_RATE', 0.5))
+BREAKER_MIN_REQUESTS = int(os.getenv('BREAKER_MIN_REQUESTS', 5))
+BREAKER_WINDOW_SECONDS = float(os.getenv('BREAKER_WINDOW_SECONDS', 60))
+BREAKER_OPEN_SECONDS = float(os.getenv('BREAKER_OPEN_SECONDS', 30))
+BREAKER_HALF_OPEN_PROBES = int(os.getenv('BREAKER_HALF_OPEN_PROBES', 1))
+
+
+class CircuitOpenError(Exception):
+    """Raised when a call is short-circuited because the breaker is open."""
+
+    def __init__(self, name: str, retry_after: float):
+        super().__init__(f"{name} is temporarily unavailable (circuit open)")
+        self.name = name
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker with a latency-driven timeout.
+
+    Closed: calls pass through; outcomes in the last window_seconds are tracked.
+    Once at least min_requests calls were seen and the failure (or timeout)
+    rate reaches failure_rate, the breaker opens.
+    Open: calls fail fast with CircuitOpenError for open_seconds.
+    Half-open: up to half_open_probes trial calls are let through; a success
+    closes the breaker, a failure opens it again.
+
+    The timeout is the timeout_percentile of recent successful latencies times
+    timeout_multiplier, clamped to [min_timeout, max_timeout]. Until enough
+    samples are seen it stays at max_timeout.
+    """
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(
+        self,
+        name: str,
+        failure_rate: float = BREAKER_FAILURE_RATE,
+        min_requests: int = BREAKER_MIN_REQUESTS,
+        window_seconds: float = BREAKER_WINDOW_SECONDS,
+        open_seconds: float = BREAKER_OPEN_SECONDS,
+        half_open_probes: int = BREAKER_HALF_OPEN_PROBES,
+        min_timeout: float = 1.0,
+        max_timeout: float = 10.0,
+        timeout_percentile: float = 0.95,
+        timeout_multiplier: float = 2.0,
+        latency_samples: int = 100,
+        min_latency_samples: int = 10,
+        max_workers: int = 16,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        self.name = name
+        self.failure_rate = failure_rate
+        self.min_requests = min_requests
+        self.window_seconds = window_seconds
+        self.open_seconds = open_seconds
+        self.half_open_probes = half_open_probes
+        self.min_timeout = min_timeout
+        self.max_timeout = max_timeout
+        self.timeout_percentile = timeout_percentile
+        self.timeout_multiplier = timeout_multiplier
+        self.min_latency_samples = min_latency_samples
+        self.max_workers = max_workers
+        self.clock = clock
+
+        self.state = self.CLOSED
+        self.opened_at = 0.0
+        self.probes_in_flight = 0
+        self.outcomes = deque()  # (timestamp, succeeded)
+        self.latencies = deque(maxlen=latency_samples)
+        self.short_circuited = 0
+        self._lock = threading.Lock()
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    def _prune(self, now: float) -> None:
+        while self.outcomes and now - self.outcomes[0][0] > self.window_seconds:
+            self.outcomes.popleft()
+
+    def _open(self, now: float) -> None:
+        self.state = self.OPEN
+        self.opened_at = now
+        self.probes_in_flight = 0
+        print(f"[BREAKER] {self.name} circuit opened")
+
+    def before_call(self) -> None:
+        """Reserve permission for a call; raises CircuitOpenError if not allowed."""
+        with self._lock:
+            now = self.clock()
+            if self.state == self.OPEN:
+                if now - self.opened_at < self.open_seconds:
+                    self.short_circuited += 1
+                    raise CircuitOpenError(self.name, self.open_seconds - (now - self.opened_at))
+                self.state = self.HALF_OPEN
+                self.probes_in_flight = 0
+                print(f"[BREAKER] {self.name} circuit half-open, probing")
+            if self.state == self.HALF_OPEN:
+                if self.probes_in_flight >= self.half_open_probes:
+                    self.short_circuited += 1
+                    raise CircuitOpenError(self.name, self.open_seconds)
+                self.probes_in_flight += 1
+
+    def record_success(self, latency: Optional[float] = None) -> None:
+        """Record a successful call and its latency in seconds."""
+        with self._lock:
+            now = self.clock()
+            if latency is not None:
+                self.latencies.append(latency)
+            if self.state == self.HALF_OPEN:
+                self.state = self.CLOSED
+                self.outcomes.clear()
+                print(f"[BREAKER] {self.name} circuit closed")
+            self.outcomes.append((now, True))
+            self._prune(now)
+
+    def record_failure(self) -> None:
+        """Record a failed or timed-out call."""
+        with self._lock:
+            now = self.clock()
+            if self.state == self.HALF_OPEN:
+                self._open(now)
+                return
+            self.outcomes.append((now, False))
+            self._prune(now)
+            if self.state == self.CLOSED and len(self.outcomes) >= self.min_requests:
+                failures = sum(1 for _, ok in self.outcomes if not ok)
+                if failures / len(self.outcomes) >= self.failure_rate:
+                    self._open(now)
+
+    def timeout(self) -> float:
+        """Current adaptive timeout in seconds."""
+        with self._lock:
+            if len(self.latencies) < self.min_latency_samples:
+                return self.max_timeout
+            samples = sorted(self.latencies)
+        index = min(len(samples) - 1, math.ceil(self.timeout_percentile * len(samples)) - 1)
+        adaptive = samples[index] * self.timeout_multiplier
+        return min(self.max_timeout, max(self.min_timeout, adaptive))
+
+    def call(
+        self,
+        fn: Callable[..., Any],
+        *args,
+        is_failure: Optional[Callable[[BaseException], bool]] = None,
+        **kwargs
+    ) -> Any:
+        """
+        Run fn through the breaker, waiting at most timeout() seconds.
+
+        Raises CircuitOpenError when short-circuited and
+        concurrent.futures.TimeoutError when the call takes too long.
+        Exceptions raised by fn are re-raised; they count as failures unless
+        is_failure(exception) returns False (e.g. for errors in the request
+        rather than the upstream's health), in which case the upstream
+        answered and the call counts as a success.
+        """
+        self.before_call()
+        timeout = self.timeout()
+        start = time.monotonic()
+        future = self._get_executor().submit(propagate(fn), *args, **kwargs)
+        try:
+            result = future.result(timeout=timeout)
+        except FutureTimeoutError:
+            # The call keeps running in the background; it's a failure for us
+            self.record_failure()
+            raise
+        except BaseException as e:
+            if is_failure is None or is_failure(e):
+                self.record_failure()
+            else:
+                self.record_success()
+            raise
+        self.record_success(time.monotonic() - start)
+        return result
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.max_workers,
+                    thread_name_prefix=f"{self.name}-upstream"
+                )
+            return self._executor
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Current state for health/monitoring output."""
+        with self._lock:
+            self._prune(self.clock())
+            failures = sum(1 for _, ok in self.outcomes if not ok)
+            total = len(self.outcomes)
+            state = self.state
+            short_circuited = self.short_circuited
+        return {
+            'state': state,
+            'recent_requests': total,
+            'recent_failure_rate': round(failures / total, 3) if total else 0.0,
+            'timeout_seconds': round(self.timeout(), 3),
+            'short_circuited': short_circuited
+        }
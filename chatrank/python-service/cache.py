@@ -3,16 +3,20 @@ Caching utilities for SerpApi responses, extracted page texts, and Gemini answer
 """
 import json
 import hashlib
+import threading
 import time
+from collections import OrderedDict
 from typing import Optional, Dict, Any
 import os
 
 class Cache:
-    """Simple in-memory cache with TTL support."""
+    """Simple in-memory cache with TTL support and optional LRU eviction."""
     
-    def __init__(self, ttl_seconds: int = 86400):
-        self.cache: Dict[str, Dict[str, Any]] = {}
+    def __init__(self, ttl_seconds: int = 86400, max_entries: Optional[int] = None):
+        self.cache: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
         self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries  # Evict least recently used entries beyond this (None = unbounded)
+        self._lock = threading.Lock()
     
     def _get_key(self, prefix: str, value: str) -> str:
         """Generate a cache key from prefix and value."""
@@ -23,27 +27,72 @@ class Cache:
     def get(self, prefix: str, value: str) -> Optional[Any]:
         """Get cached value if it exists and hasn't expired."""
         key = self._get_key(prefix, value)
-        if key in self.cache:
-            entry = self.cache[key]
-            if time.time() - entry['timestamp'] < self.ttl_seconds:
-                print(f"[CACHE HIT] {prefix}: {value[:50]}...")
-                return entry['data']
-            else:
-                # Expired, remove it
-                del self.cache[key]
-                print(f"[CACHE EXPIRED] {prefix}: {value[:50]}...")
+        with self._lock:
+            entry = self.cache.get(key)
+            if entry is not None:
+                if time.time() - entry['timestamp'] < self.ttl_seconds:
+                    self.cache.move_to_end(key)
+                else:
+                    # Expired, remove it
+                    del self.cache[key]
+                    entry = None
+                    print(f"[CACHE EXPIRED] {prefix}: {value[:50]}...")
+        if entry is not None:
+            print(f"[CACHE HIT] {prefix}: {value[:50]}...")
+            return entry['data']
         print(f"[CACHE MISS] {prefix}: {value[:50]}...")
         return None
     
+    def peek(self, prefix: str, value: str) -> Optional[Dict[str, float]]:
+        """
+        Return {'timestamp', 'expires_in'} for a live entry without reading it.
+        Used to derive HTTP validators from cached inputs.
+        """
+        entry = self.cache.get(self._get_key(prefix, value))
+        if entry is None:
+            return None
+        expires_in = self.ttl_seconds - (time.time() - entry['timestamp'])
+        if expires_in <= 0:
+            return None
+        return {'timestamp': entry['timestamp'], 'expires_in': expires_in}
+    
     def set(self, prefix: str, value: str, data: Any) -> None:
         """Store value in cache with current timestamp."""
         key = self._get_key(prefix, value)
-        self.cache[key] = {
-            'data': data,
-            'timestamp': time.time()
-        }
+        with self._lock:
+            self.cache[key] = {
+                'data': data,
+                'prefix': prefix,
+                'timestamp': time.time()
+            }
+            self.cache.move_to_end(key)
+            evicted = 0
+            while self.max_entries is not None and len(self.cache) > self.max_entries:
+                self.cache.popitem(last=False)
+                evicted += 1
         print(f"[CACHE SET] {prefix}: {value[:50]}...")
+        if evicted:
+            print(f"[CACHE EVICT] {evicted} least recently used entries")
+
+    def delete(self, prefix: str, value: str) -> None:
+        """Remove an entry if present."""
+        with self._lock:
+            self.cache.pop(self._get_key(prefix, value), None)
 
 # Global cache instance
 cache = Cache(ttl_seconds=int(os.getenv('CACHE_TTL_SECONDS', 86400)))
 
+# Candidate sets and their ranking score vectors, kept for pagination and
+# re-ranking, keyed by result-set id
+result_sets = Cache(
+    ttl_seconds=int(os.getenv('RESULT_SET_TTL_SECONDS', 1800)),
+    max_entries=int(os.getenv('RESULT_SET_MAX_ENTRIES', 1000))
+)
+
+# Validators (ETag, Last-Modified, content hash) and extracted text of fetched
+# pages, kept well beyond CACHE_TTL_SECONDS so expired pages can be revalidated
+# with a conditional GET instead of being downloaded and parsed again
+page_validators = Cache(
+    ttl_seconds=int(os.getenv('PAGE_VALIDATOR_TTL_SECONDS', 7 * 86400)),
+    max_entries=int(os.getenv('PAGE_VALIDATOR_MAX_ENTRIES', 5000))
+)
@@ -0,0 +1,158 @@
+"""
+Near-duplicate collapsing of search candidates (URL canonicalization + SimHash).
+"""
+import hashlib
+import os
+import re
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import parse_qsl, urlencode, urlsplit
+
+import numpy as np
+
+# Results whose fingerprints differ in at most this many of 64 bits are duplicates
+# (snippets are short, so small edits move more bits than on full pages)
+DEDUP_HAMMING_THRESHOLD = int(os.getenv('DEDUP_HAMMING_THRESHOLD', 8))
+# Texts with fewer shingles than this are only deduplicated by URL
+DEDUP_MIN_SHINGLES = int(os.getenv('DEDUP_MIN_SHINGLES', 4))
+# Only the start of long page texts is fingerprinted
+DEDUP_MAX_CHARS = int(os.getenv('DEDUP_MAX_CHARS', 2000))
+
+FINGERPRINT_BITS = 64
+
+# Query parameters that don't change page content
+TRACKING_PARAMS = {'gclid', 'fbclid', 'msclkid', 'ref', 'ref_src', 'cmpid', 'mc_cid', 'mc_eid', 'amp'}
+HOST_PREFIXES = ('www.', 'm.', 'mobile.', 'amp.')
+
+_TOKEN = re.compile(r'[a-z0-9]+')
+
+
+@lru_cache(maxsize=int(os.getenv('DEDUP_FINGERPRINT_CACHE_SIZE', 4096)))
+def canonicalize_url(url: str) -> str:
+    """
+    Canonical form of a URL for duplicate detection: scheme, fragment,
+    tracking parameters, 'www.'/mobile/AMP host prefixes, default ports and
+    trailing slashes or index pages are dropped; query parameters are sorted.
+    Malformed URLs (bad port or IPv6 host) are only stripped.
+    """
+    try:
+        parts = urlsplit(url.strip())
+        port = parts.port
+    except ValueError:
+        return url.strip()
+    host = (parts.hostname or '').lower()
+    for prefix in HOST_PREFIXES:
+        if host.startswith(prefix):
+            host = host[len(prefix):]
+            break
+    if port and port not in (80, 443):
+        host = f"{host}:{port}"
+
+    path = re.sub(r'/(index\.(html?|php)|amp)$', '', parts.path)
+    path = path.rstrip('/')
+    query = sorted(
+        (key, value) for key, value in parse_qsl(parts.query, keep_blank_values=True)
+        if not key.lower().startswith('utm_') and key.lower() not in TRACKING_PARAMS
+    )
+    canonical = host + path
+    if query:
+        canonical += '?' + urlencode(query)
+    return canonical
+
+
+def _shingles(text: str) -> List[str]:
+    tokens = _TOKEN.findall(text.lower())
+    if len(tokens) < 2:
+        return tokens
+    return [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]
+
+
+def simhash(text: str) -> Optional[int]:
+    """64-bit SimHash of a text's word bigrams, or None if the text is too short."""
+    # Truncated before the cache lookup, so cached keys are at most DEDUP_MAX_CHARS long
+    return _simhash(text[:DEDUP_MAX_CHARS])
+
+
+@lru_cache(maxsize=int(os.getenv('DEDUP_FINGERPRINT_CACHE_SIZE', 4096)))
+def _simhash(text: str) -> Optional[int]:
+    shingles = _shingles(text)
+    if len(shingles) < DEDUP_MIN_SHINGLES:
+        return None
+    hashes = np.frombuffer(
+        b''.join(hashlib.blake2b(s.encode('utf-8'), digest_size=8).digest() for s in shingles),
+        dtype=np.uint8
+    ).reshape(len(shingles), 8)
+    # Per-bit vote: +1 for set bits, -1 for clear bits
+    votes = np.unpackbits(hashes, axis=1).sum(axis=0, dtype=np.int64) * 2 - len(shingles)
+    return int.from_bytes(np.packbits(votes > 0).tobytes(), 'big')
+
+
+def hamming_distance(a: int, b: int) -> int:
+    return bin(a ^ b).count('1')
+
+
+@lru_cache(maxsize=int(os.getenv('DEDUP_FINGERPRINT_CACHE_SIZE', 4096)))
+def _bands(fingerprint: int, num_bands: int) -> Tuple[Tuple[int, int], ...]:
+    """(band index, band value) pairs splitting a fingerprint into num_bands parts."""
+    bounds = [i * FINGERPRINT_BITS // num_bands for i in range(num_bands + 1)]
+    return tuple(
+        (i, (fingerprint >> start) & ((1 << (end - start)) - 1))
+        for i, (start, end) in enumerate(zip(bounds, bounds[1:]))
+    )
+
+
+def collapse_duplicates(results: List[Dict], threshold: int = DEDUP_HAMMING_THRESHOLD) -> List[Dict]:
+    """
+    Collapse near-duplicate results into the first (best-positioned) copy.
+
+    Two results are duplicates when their canonical URLs match, or when the
+    SimHash fingerprints of their text (or snippet) differ in at most
+    threshold bits. Kept results get a 'duplicates' list with the title, url
+    and domain of the copies collapsed into them; the copies are dropped, so
+    they are neither fetched nor scored.
+
+    Fingerprints are split into threshold + 1 bands: two fingerprints within
+    threshold bits share at least one band exactly, so only results sharing
+    a band are compared.
+    """
+    num_bands = min(threshold + 1, FINGERPRINT_BITS)
+    kept: List[Dict] = []
+    by_url: Dict[str, Dict] = {}
+    by_band: Dict[Tuple[int, int], List[Tuple[int, Dict]]] = {}
+
+    for result in results:
+        url_key = canonicalize_url(result.get('url') or '')
+        original = by_url.get(url_key) if url_key else None
+
+        fingerprint = bands = None
+        if original is None:
+            fingerprint = simhash(result.get('text') or result.get('snippet') or '')
+        if original is None and fingerprint is not None:
+            bands = _bands(fingerprint, num_bands)
+            for band in bands:
+                for other_fingerprint, other in by_band.get(band, ()):
+                    if hamming_distance(fingerprint, other_fingerprint) <= threshold:
+                        original = other
+                        break
+                if original is not None:
+                    break
+
+        if original is not None:
+            original['duplicates'].append({
+                'title': result.get('title'),
+                'url': result.get('url'),
+                'domain': result.get('domain')
+            })
+            continue
+
+        result = dict(result, duplicates=[])
+        kept.append(result)
+        if url_key:
+            by_url[url_key] = result
+        if bands is not None:
+            for band in bands:
+                by_band.setdefault(band, []).append((fingerprint, result))
+
+    if len(kept) < len(results):
+        print(f"[DEDUP] Collapsed {len(results) - len(kept)} of {len(results)} results")
+    return kept
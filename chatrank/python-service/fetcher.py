@@ -1,62 +1,224 @@
 """
 Fetch and extract text content from web pages.
+
+Fetching and parsing are separate stages: raw page bytes are downloaded
+concurrently in threads (I/O bound), then handed to a persistent process pool
+for HTML parsing and text preprocessing (CPU bound), so parsing doesn't hold
+the GIL in the request threads.
+
+Expired pages are revalidated with conditional GETs (ETag / Last-Modified);
+a 304 or an unchanged content hash reuses the previous extraction without
+parsing. Failures are cached separately with a short, growing TTL.
 """
+import hashlib
+import os
+import multiprocessing
+import threading
+import time
 import requests
-from bs4 import BeautifulSoup
-from typing import Optional, Dict
-from cache import cache
+from concurrent.futures import (
+    ProcessPoolExecutor, ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+)
+from concurrent.futures.process import BrokenProcessPool
+from typing import Optional, Dict, Iterable
+from cache import Cache, cache, page_validators
+from profiling import propagate
 import re
 
-# Try to import newspaper3k, but handle if it fails (e.g., lxml compatibility issues)
-try:
-    from newspaper import Article
-    NEWSPAPER_AVAILABLE = True
-except ImportError as e:
-    NEWSPAPER_AVAILABLE = False
-    print(f"[FETCHER] newspaper3k not available: {e}. Using BeautifulSoup only.")
+# HTML parsers are imported on first use (see load_parsers); they are only
+# needed inside the extraction workers
+BeautifulSoup = None
+UnicodeDammit = None
+Article = None
+NEWSPAPER_AVAILABLE: Optional[bool] = None
 
-def fetch_and_extract(url: str) -> Dict[str, Optional[str]]:
+# Extraction worker processes (0 = parse in the calling thread)
+EXTRACT_WORKERS = int(os.getenv('EXTRACT_WORKERS', os.cpu_count() or 1))
+# Concurrent page downloads per batch
+FETCH_CONCURRENCY = int(os.getenv('FETCH_CONCURRENCY', 8))
+# Max seconds to wait for a single page to be parsed
+EXTRACT_TIMEOUT_SECONDS = float(os.getenv('EXTRACT_TIMEOUT_SECONDS', 10))
+
+# Failed pages are retried after this many seconds, doubling per consecutive failure
+FETCH_FAILURE_TTL_SECONDS = float(os.getenv('FETCH_FAILURE_TTL_SECONDS', 60))
+FETCH_FAILURE_MAX_TTL_SECONDS = float(os.getenv('FETCH_FAILURE_MAX_TTL_SECONDS', 3600))
+
+# Consecutive failures per URL and when to retry it (the negative cache)
+page_failures = Cache(
+    ttl_seconds=int(2 * FETCH_FAILURE_MAX_TTL_SECONDS),
+    max_entries=int(os.getenv('FETCH_FAILURE_MAX_ENTRIES', 10000))
+)
+
+FETCH_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
+}
+
+_fetch_stats = {
+    'downloads': 0,
+    'bytes_downloaded': 0,
+    'not_modified': 0,  # 304 responses to conditional GETs
+    'unchanged': 0,  # Full downloads whose content hash matched
+    'bytes_saved': 0,
+    'parsed': 0,
+    'parse_seconds': 0.0,
+    'parse_seconds_saved': 0.0,
+    'failures': 0,
+    'negative_hits': 0  # Requests answered from the negative cache
+}
+_fetch_stats_lock = threading.Lock()
+
+def _count(**deltas) -> None:
+    with _fetch_stats_lock:
+        for name, delta in deltas.items():
+            _fetch_stats[name] += delta
+
+def get_fetch_stats() -> Dict:
+    """Download, revalidation and parse counters since startup."""
+    with _fetch_stats_lock:
+        stats = dict(_fetch_stats)
+    stats['parse_seconds'] = round(stats['parse_seconds'], 3)
+    stats['parse_seconds_saved'] = round(stats['parse_seconds_saved'], 3)
+    return stats
+
+_extraction_pool: Optional[ProcessPoolExecutor] = None
+_extraction_pool_lock = threading.Lock()
+
+def get_extraction_pool() -> Optional[ProcessPoolExecutor]:
+    """Return the shared extraction process pool, creating it on first use."""
+    global _extraction_pool
+    if EXTRACT_WORKERS <= 0:
+        return None
+    with _extraction_pool_lock:
+        if _extraction_pool is None:
+            # 'spawn' avoids forking a process that already runs server threads
+            _extraction_pool = ProcessPoolExecutor(
+                max_workers=EXTRACT_WORKERS,
+                mp_context=multiprocessing.get_context('spawn')
+            )
+            print(f"[FETCHER] Started extraction pool with {EXTRACT_WORKERS} workers")
+        return _extraction_pool
+
+def _reset_extraction_pool(broken: ProcessPoolExecutor) -> None:
+    """Replace a pool whose worker died so later pages get a fresh pool."""
+    global _extraction_pool
+    with _extraction_pool_lock:
+        if _extraction_pool is not broken:
+            return  # Already replaced by another request
+        _extraction_pool = None
+    broken.shutdown(wait=False, cancel_futures=True)
+    print(f"[FETCHER] Extraction worker crashed, pool will be restarted")
+
+def shutdown_extraction_pool() -> None:
+    """Stop the extraction workers (called on application shutdown)."""
+    global _extraction_pool
+    with _extraction_pool_lock:
+        pool, _extraction_pool = _extraction_pool, None
+    if pool is not None:
+        pool.shutdown(wait=True, cancel_futures=True)
+
+def load_parsers() -> None:
+    """Import BeautifulSoup and newspaper3k once per process."""
+    global BeautifulSoup, UnicodeDammit, Article, NEWSPAPER_AVAILABLE
+    if NEWSPAPER_AVAILABLE is not None:
+        return
+    from bs4 import BeautifulSoup as _BeautifulSoup, UnicodeDammit as _UnicodeDammit
+    BeautifulSoup = _BeautifulSoup
+    UnicodeDammit = _UnicodeDammit
+    
+    # Try to import newspaper3k, but handle if it fails (e.g., lxml compatibility issues)
+    try:
+        from newspaper import Article as _Article
+        Article = _Article
+        NEWSPAPER_AVAILABLE = True
+    except ImportError as e:
+        NEWSPAPER_AVAILABLE = False
+        print(f"[FETCHER] newspaper3k not available: {e}. Using BeautifulSoup only.")
+
+def _unavailable() -> Dict[str, Optional[str]]:
+    return {
+        'text': None,
+        'snippet': None,
+        'preview_unavailable': True
+    }
+
+def content_hash(content: bytes) -> str:
+    return hashlib.blake2b(content, digest_size=16).hexdigest()
+
+def fetch_raw(url: str, validators: Optional[Dict] = None) -> Optional[Dict]:
     """
-    Fetch a webpage and extract its text content.
+    Download a page without parsing it.
+    
+    With validators from an earlier download ('etag', 'last_modified') the
+    request is conditional.
     
     Returns:
-        Dict with 'text' (extracted content) and 'snippet' (first paragraph)
+        Dict with 'content' (raw bytes), 'encoding' (the Content-Type charset,
+        or None to detect it from the page), 'content_hash', 'etag' and
+        'last_modified'; {'not_modified': True, 'etag', 'last_modified'} on a
+        304; or None on failure
     """
-    # Check cache first
-    cached = cache.get('page_text', url)
-    if cached:
-        return cached
+    headers = FETCH_HEADERS
+    if validators and (validators.get('etag') or validators.get('last_modified')):
+        headers = dict(FETCH_HEADERS)
+        if validators.get('etag'):
+            headers['If-None-Match'] = validators['etag']
+        if validators.get('last_modified'):
+            headers['If-Modified-Since'] = validators['last_modified']
+    try:
+        response = requests.get(url, headers=headers, timeout=3)  # Very short timeout
+        if response.status_code == 304 and headers is not FETCH_HEADERS:
+            return {
+                'not_modified': True,
+                'etag': response.headers.get('ETag') or validators.get('etag'),
+                'last_modified': response.headers.get('Last-Modified') or validators.get('last_modified')
+            }
+        response.raise_for_status()
+        content = response.content
+        # requests defaults text/html without a charset to ISO-8859-1; only
+        # pass on an explicit charset so <meta charset> and detection still apply
+        has_charset = 'charset=' in response.headers.get('Content-Type', '').lower()
+        return {
+            'content': content,
+            'encoding': response.encoding if has_charset else None,
+            'content_hash': content_hash(content),
+            'etag': response.headers.get('ETag'),
+            'last_modified': response.headers.get('Last-Modified')
+        }
+    except Exception as e:
+        print(f"[FETCHER] Download failed for {url}: {str(e)}")
+        return None
+
+def extract_from_html(url: str, content: bytes, encoding: Optional[str] = None) -> Dict[str, Optional[str]]:
+    """
+    Extract text and snippet from raw page bytes.
+    
+    encoding is the charset from the Content-Type header, if any; otherwise
+    it is taken from the page's <meta charset> or detected.
+    Pure CPU work with no network access; runs inside the extraction workers.
+    """
+    load_parsers()
     
     # Try newspaper3k first if available
     if NEWSPAPER_AVAILABLE:
         try:
-            article = Article(url)
-            article.download()
+            article = Article(url, fetch_images=False)
+            html = UnicodeDammit(content, [encoding] if encoding else [], is_html=True).unicode_markup
+            article.download(input_html=html)
             article.parse()
             
             if article.text and len(article.text.strip()) > 100:
                 text = preprocess_text(article.text)
-                snippet = extract_snippet(text, 300)
-                
-                result = {
+                return {
                     'text': text,
-                    'snippet': snippet,
+                    'snippet': extract_snippet(text, 300),
                     'preview_unavailable': False
                 }
-                cache.set('page_text', url, result)
-                return result
         except Exception as e:
             print(f"[FETCHER] newspaper3k failed for {url}: {str(e)}")
     
     # Fallback to BeautifulSoup
     try:
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
-        }
-        response = requests.get(url, headers=headers, timeout=3)  # Very short timeout
-        response.raise_for_status()
-        
-        soup = BeautifulSoup(response.content, 'html.parser')
+        soup = BeautifulSoup(content, 'html.parser', from_encoding=encoding)
         
         # Remove script and style elements
         for script in soup(["script", "style", "nav", "footer", "header"]):
@@ -69,25 +231,190 @@ def fetch_and_extract(url: str) -> Dict[str, Optional[str]]:
             text = preprocess_text(text)
             
             if len(text.strip()) > 100:
-                snippet = extract_snippet(text, 300)
-                result = {
+                return {
                     'text': text,
-                    'snippet': snippet,
+                    'snippet': extract_snippet(text, 300),
                     'preview_unavailable': False
                 }
-                cache.set('page_text', url, result)
-                return result
     except Exception as e:
         print(f"[FETCHER] BeautifulSoup fallback failed for {url}: {str(e)}")
     
     # If all extraction methods fail
-    result = {
-        'text': None,
-        'snippet': None,
-        'preview_unavailable': True
-    }
-    cache.set('page_text', url, result)
-    return result
+    return _unavailable()
+
+def timed_extract(url: str, content: bytes, encoding: Optional[str] = None):
+    """extract_from_html() and the seconds it took (runs inside the extraction workers)."""
+    start = time.perf_counter()
+    result = extract_from_html(url, content, encoding)
+    return result, time.perf_counter() - start
+
+def _record_failure(url: str) -> None:
+    """Cache a failed page with an exponentially growing retry delay."""
+    previous = page_failures.get('page_failure', url)
+    failures = (previous['failures'] if previous else 0) + 1
+    delay = min(FETCH_FAILURE_TTL_SECONDS * 2 ** (failures - 1), FETCH_FAILURE_MAX_TTL_SECONDS)
+    page_failures.set('page_failure', url, {'failures': failures, 'retry_at': time.time() + delay})
+    _count(failures=1)
+
+def _extraction_result(url: str, future):
+    """
+    Wait for a page parsed in the pool: (result, parse seconds), or
+    (_unavailable(), None) on timeout or error. BrokenProcessPool is raised.
+    """
+    try:
+        return future.result(timeout=EXTRACT_TIMEOUT_SECONDS)
+    except BrokenProcessPool:
+        raise
+    except FutureTimeoutError:
+        print(f"[FETCHER] Extraction timed out for {url}")
+        future.cancel()
+    except Exception as e:
+        print(f"[FETCHER] Extraction failed for {url}: {str(e)}")
+    return _unavailable(), None
+
+def fetch_and_extract(url: str) -> Dict[str, Optional[str]]:
+    """
+    Fetch a webpage and extract its text content.
+    
+    Returns:
+        Dict with 'text' (extracted content) and 'snippet' (first paragraph)
+    """
+    return fetch_and_extract_many([url])[url]
+
+def fetch_and_extract_many(urls: Iterable[str]) -> Dict[str, Dict[str, Optional[str]]]:
+    """
+    Fetch and extract several pages: downloads run concurrently in threads,
+    parsing runs in the extraction process pool.
+    
+    Pages whose cached text expired are revalidated: a 304 or an unchanged
+    content hash reuses the previous extraction. Failed pages are answered
+    from the negative cache until their retry time.
+    
+    A crashing extraction worker breaks the whole pool, failing the pages of
+    every batch parsing at that moment; each batch retries its lost pages
+    once, one by one, on a fresh pool.
+    
+    Returns:
+        Dict mapping each URL to its fetch_and_extract() result
+    """
+    results = {}
+    pending = []
+    now = time.time()
+    for url in dict.fromkeys(urls):
+        # Check cache first
+        cached = cache.get('page_text', url)
+        if cached:
+            results[url] = cached
+            continue
+        failure = page_failures.get('page_failure', url)
+        if failure and now < failure['retry_at']:
+            results[url] = _unavailable()
+            _count(negative_hits=1)
+            continue
+        pending.append(url)
+    
+    if not pending:
+        return results
+    
+    validators = {url: page_validators.get('page', url) for url in pending}
+    
+    # Stage 1: download raw bytes (I/O concurrency), conditionally where possible
+    with ThreadPoolExecutor(max_workers=min(FETCH_CONCURRENCY, len(pending))) as executor:
+        downloads = dict(zip(pending, executor.map(
+            propagate(lambda url: fetch_raw(url, validators[url])), pending
+        )))
+    
+    # Stage 2: reuse unchanged pages, parse the rest in worker processes
+    pool = get_extraction_pool()
+    futures = {}
+    parse_seconds = {}  # Per parsed URL; absent when no extraction completed
+    reused = set()
+    for url, raw in downloads.items():
+        stored = validators[url]
+        if raw is None:
+            results[url] = _unavailable()
+            continue
+        if raw.get('not_modified'):
+            _count(not_modified=1, bytes_saved=stored['bytes'])
+        else:
+            _count(downloads=1, bytes_downloaded=len(raw['content']))
+        if stored is not None and (raw.get('not_modified') or raw['content_hash'] == stored['content_hash']):
+            if not raw.get('not_modified'):
+                _count(unchanged=1)
+            _count(parse_seconds_saved=stored['parse_seconds'])
+            results[url] = stored['result']
+            reused.add(url)
+        elif raw.get('not_modified'):
+            results[url] = _unavailable()  # 304 without a stored copy (evicted meanwhile)
+        elif pool is None:
+            results[url], parse_seconds[url] = timed_extract(url, raw['content'], raw['encoding'])
+        else:
+            try:
+                futures[url] = pool.submit(timed_extract, url, raw['content'], raw['encoding'])
+            except BrokenProcessPool:
+                # Pool broke after an earlier crash; retry once on a fresh one
+                _reset_extraction_pool(pool)
+                pool = get_extraction_pool()
+                futures[url] = pool.submit(timed_extract, url, raw['content'], raw['encoding'])
+    
+    broken = []
+    for url, future in futures.items():
+        try:
+            results[url], seconds = _extraction_result(url, future)
+        except BrokenProcessPool:
+            # A worker died (e.g. parser crash). Every page in flight on the
+            # pool fails with it, including pages of concurrent requests
+            _reset_extraction_pool(pool)
+            broken.append(url)
+            continue
+        if seconds is not None:
+            parse_seconds[url] = seconds
+    
+    # Retry pages lost with a crashed pool once, one at a time on a fresh pool,
+    # so a page that crashes it again only fails itself. Pages crashing twice
+    # aren't cached, so a later request tries them again.
+    crashed = set()
+    for url in broken:
+        pool = get_extraction_pool()
+        try:
+            future = pool.submit(timed_extract, url, downloads[url]['content'], downloads[url]['encoding'])
+            results[url], seconds = _extraction_result(url, future)
+        except BrokenProcessPool:
+            print(f"[FETCHER] Extraction crashed twice for {url}")
+            _reset_extraction_pool(pool)
+            crashed.add(url)
+            results[url] = _unavailable()
+            continue
+        if seconds is not None:
+            parse_seconds[url] = seconds
+    
+    for url, raw in downloads.items():
+        if url in crashed:
+            continue
+        if url in parse_seconds:
+            _count(parsed=1, parse_seconds=parse_seconds[url])
+            page_validators.set('page', url, {
+                'etag': raw['etag'],
+                'last_modified': raw['last_modified'],
+                'content_hash': raw['content_hash'],
+                'bytes': len(raw['content']),
+                'parse_seconds': parse_seconds[url],
+                'result': results[url]
+            })
+        elif url in reused:
+            page_validators.set('page', url, dict(
+                validators[url], etag=raw['etag'] or validators[url]['etag'],
+                last_modified=raw['last_modified'] or validators[url]['last_modified']
+            ))
+        
+        if results[url].get('preview_unavailable'):
+            # Negative results get a short TTL instead of CACHE_TTL_SECONDS
+            _record_failure(url)
+        else:
+            cache.set('page_text', url, results[url])
+            page_failures.delete('page_failure', url)
+    
+    return results
 
 def preprocess_text(text: str) -> str:
     """
@@ -0,0 +1,55 @@
+"""
+HTTP caching helpers: ETags derived from cached inputs and conditional responses.
+"""
+import hashlib
+import json
+import math
+from typing import Any, Dict, Optional
+
+from fastapi import Response
+
+
+def content_hash(*parts: Any) -> str:
+    """Stable hex digest of JSON-serializable inputs (same across processes)."""
+    return hashlib.sha1(
+        json.dumps(parts, sort_keys=True, separators=(',', ':'), default=str).encode('utf-8')
+    ).hexdigest()[:32]
+
+
+def make_etag(*parts: Any) -> str:
+    """Weak ETag from JSON-serializable inputs."""
+    return f'W/"{content_hash(*parts)}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Weak comparison of an If-None-Match header against an ETag."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == '*':
+        return True
+    opaque = etag[2:] if etag.startswith('W/') else etag
+    for candidate in if_none_match.split(','):
+        candidate = candidate.strip()
+        if candidate.startswith('W/'):
+            candidate = candidate[2:]
+        if candidate == opaque:
+            return True
+    return False
+
+
+def cache_headers(etag: Optional[str], max_age: Optional[float]) -> Dict[str, str]:
+    """ETag, Cache-Control and Vary headers for a response."""
+    headers = {'Vary': 'Accept-Encoding'}
+    if etag is None or not max_age or max_age <= 0:
+        # Not derived from cached inputs (e.g. a fallback answer): always revalidate
+        headers['Cache-Control'] = 'no-cache'
+    else:
+        headers['Cache-Control'] = f'public, max-age={int(math.floor(max_age))}'
+    if etag is not None:
+        headers['ETag'] = etag
+    return headers
+
+
+def not_modified(headers: Dict[str, str]) -> Response:
+    """304 response carrying the validators."""
+    return Response(status_code=304, headers=headers)
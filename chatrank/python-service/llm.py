@@ -2,30 +2,78 @@
 Gemini LLM integration for generating AI answers.
 """
 import os
+from concurrent.futures import TimeoutError as FutureTimeoutError
 from typing import Optional
 
-import google.generativeai as genai
-
+from breaker import CircuitBreaker, CircuitOpenError
 from cache import cache
 
 GEMINI_API_KEY = os.getenv('GEMINI_API_KEY')
 
+# Trips on Gemini errors/timeouts; the timeout adapts to observed latency
+gemini_breaker = CircuitBreaker(
+    'Gemini',
+    min_timeout=float(os.getenv('GEMINI_TIMEOUT_MIN_SECONDS', 1.5)),
+    max_timeout=float(os.getenv('GEMINI_TIMEOUT_MAX_SECONDS', 5))
+)
+
 
 class GeminiUnavailable(Exception):
-    """Raised when Gemini cannot provide an answer."""
+    """
+    Raised when Gemini cannot provide an answer. transient is True for
+    errors that say something about Gemini's health (network, DNS,
+    timeouts, 429 and 5xx); only those count against the circuit breaker.
+    """
+
+    def __init__(self, message: str, retry_after: Optional[float] = None, transient: bool = False):
+        super().__init__(message)
+        self.retry_after = retry_after
+        self.transient = transient
+
+
+class GeminiTimeout(GeminiUnavailable):
+    """Raised when Gemini doesn't answer within the current timeout."""
+
+    def __init__(self, message: str, retry_after: Optional[float] = None):
+        super().__init__(message, retry_after=retry_after, transient=True)
+
+
+def is_gemini_failure(error: BaseException) -> bool:
+    """Whether an error from _generate_answer counts against the Gemini breaker."""
+    return not isinstance(error, GeminiUnavailable) or error.transient
+
+
+def _is_transient(error: Exception) -> bool:
+    """Network, DNS, timeout, 429 and 5xx errors (bad requests, keys or models are not)."""
+    if isinstance(error, (ConnectionError, TimeoutError)):
+        return True
+    status = getattr(error, 'code', None)
+    if isinstance(status, int):
+        return status == 429 or status >= 500
+    lower_err = str(error).lower()
+    return any(keyword in lower_err for keyword in ["dns", "timeout", "503", "network", "unavailable"])
+
+
+def load_gemini_client():
+    """Import the Gemini SDK (slow to import, so loaded on first use or during warm-up)."""
+    import google.generativeai as genai
+    return genai
 
 
 def initialize_gemini():
     """Initialize Gemini API client."""
     if not GEMINI_API_KEY:
         raise ValueError("GEMINI_API_KEY environment variable not set")
+    genai = load_gemini_client()
     genai.configure(api_key=GEMINI_API_KEY)
+    return genai
 
 
 def get_ai_answer(query: str) -> str:
     """
     Get a 1-2 paragraph AI answer from Gemini for the query.
-    Raises GeminiUnavailable if Gemini cannot respond.
+    Raises GeminiUnavailable if Gemini cannot respond (GeminiTimeout if it
+    is too slow) and fails fast while the Gemini circuit breaker is open.
     """
     if not GEMINI_API_KEY:
         raise ValueError("GEMINI_API_KEY environment variable not set")
@@ -36,7 +84,22 @@ def get_ai_answer(query: str) -> str:
         return cached
 
     try:
-        initialize_gemini()
+        answer = gemini_breaker.call(_generate_answer, query, is_failure=is_gemini_failure)
+    except CircuitOpenError as e:
+        raise GeminiUnavailable(str(e), retry_after=e.retry_after) from e
+    except FutureTimeoutError as e:
+        raise GeminiTimeout("Gemini request timed out.") from e
+
+    # Cache the answer
+    cache.set('gemini', query, answer)
+
+    return answer
+
+
+def _generate_answer(query: str) -> str:
+    """Call Gemini (runs in the breaker's worker threads)."""
+    try:
+        genai = initialize_gemini()
         model = genai.GenerativeModel('models/gemini-2.0-flash')
 
         prompt = (
@@ -57,22 +120,21 @@ def get_ai_answer(query: str) -> str:
             },
         )
 
-        answer = (response.text or "").strip()
+        try:
+            answer = (response.text or "").strip()
+        except ValueError as e:
+            # No text parts, e.g. the answer was blocked by safety filters
+            raise GeminiUnavailable("Gemini returned no answer for this query.") from e
         if not answer:
             raise GeminiUnavailable("Gemini returned an empty response.")
 
         # Add source suggestion
         answer += "\n\nReview the search results below for sources and additional context."
 
-        # Cache the answer
-        cache.set('gemini', query, answer)
-
         return answer
     except GeminiUnavailable:
         raise
     except Exception as e:
-        error_msg = str(e)
-        lower_err = error_msg.lower()
-        if any(keyword in lower_err for keyword in ["dns", "timeout", "503", "network", "unavailable"]):
-            raise GeminiUnavailable("Gemini API network timeout or DNS error.") from e
-        raise GeminiUnavailable(f"Gemini API error: {error_msg}") from e
+        if _is_transient(e):
+            raise GeminiUnavailable("Gemini API network timeout or DNS error.", transient=True) from e
+        raise GeminiUnavailable(f"Gemini API error: {str(e)}") from e
@@ -0,0 +1,458 @@
+"""
+Local corpus search: on-disk inverted index with memory-mapped postings.
+
+Build an index from a JSONL dump (one {"url", "title", "text", ...} object per
+line) or from pages fetched with fetch_and_extract:
+
+    python local_index.py --out ./local-index --jsonl dump.jsonl
+    python local_index.py --out ./local-index --urls urls.txt
+
+Index layout (all arrays are .npy files opened with mmap_mode='r'):
+    meta.json         document/term counts, average document length and build id
+    term_hashes.npy   sorted 64-bit term hashes (uint64)
+    term_offsets.npy  postings range of each term (int64, num_terms + 1)
+    postings_docs.npy document ids, grouped by term, ascending (uint32)
+    postings_tf.npy   term frequencies aligned with postings_docs (uint16)
+    doc_lengths.npy   tokens per document (uint32)
+    doc_offsets.npy   byte range of each document in docs.bin (int64, num_docs + 1)
+    docs.bin          concatenated UTF-8 JSON document records
+"""
+import argparse
+import hashlib
+import json
+import math
+import mmap
+import os
+import shutil
+import threading
+import uuid
+from array import array
+from collections import Counter
+from typing import Dict, Iterable, Iterator, List, Optional
+from urllib.parse import urlparse
+
+import numpy as np
+
+from fetcher import extract_snippet, fetch_and_extract_many, preprocess_text
+from ranker import select_top_k, tokenize_query
+
+LOCAL_INDEX_DIR = os.getenv('LOCAL_INDEX_DIR')
+
+INDEX_VERSION = 1
+MAX_TF = np.iinfo(np.uint16).max
+
+# BM25 parameters
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+
+def term_hash(term: str) -> int:
+    """Stable 64-bit hash of a term."""
+    return int.from_bytes(hashlib.blake2b(term.encode('utf-8'), digest_size=8).digest(), 'little')
+
+
+class LocalIndexBuilder:
+    """
+    Builds an on-disk inverted index.
+
+    Postings are buffered in blocks of at most block_size entries, each block
+    is sorted and spilled to disk, and finish() merges the blocks straight into
+    the memory-mapped postings files, so memory use stays bounded by the block
+    size rather than the corpus size.
+
+    Files are written into out_dir in place; build_index() builds in a
+    staging directory and swaps it in, which is safe while the index is served.
+    """
+
+    def __init__(self, out_dir: str, block_size: int = 2_000_000):
+        self.out_dir = out_dir
+        self.block_size = block_size
+        self.block_dir = os.path.join(out_dir, '_blocks')
+        os.makedirs(self.block_dir, exist_ok=True)
+
+        self.num_docs = 0
+        self.total_tokens = 0
+        self.doc_lengths = array('I')
+        self.doc_offsets = array('q', [0])
+        self.docs_file = open(os.path.join(out_dir, 'docs.bin'), 'wb')
+
+        self.block_count = 0
+        self._terms = array('Q')
+        self._docs = array('I')
+        self._tfs = array('H')
+
+    def add(self, doc: Dict) -> Optional[int]:
+        """Add a document; returns its id, or None if it has no text."""
+        text = preprocess_text(doc.get('text') or doc.get('snippet') or '')
+        if not text:
+            return None
+
+        url = doc.get('url') or doc.get('link') or ''
+        record = {
+            'title': doc.get('title') or url or 'No title',
+            'url': url,
+            'domain': doc.get('domain') or urlparse(url).netloc,
+            'snippet': doc.get('snippet') or extract_snippet(text, 300),
+            'date': doc.get('date', ''),
+            'text': text
+        }
+        data = json.dumps(record, ensure_ascii=False).encode('utf-8')
+        self.docs_file.write(data)
+        self.doc_offsets.append(self.doc_offsets[-1] + len(data))
+
+        doc_id = self.num_docs
+        tokens = tokenize_query(text)
+        counts = Counter(tokens)
+        for term, tf in counts.items():
+            self._terms.append(term_hash(term))
+            self._docs.append(doc_id)
+            self._tfs.append(min(tf, MAX_TF))
+
+        self.doc_lengths.append(len(tokens))
+        self.total_tokens += len(tokens)
+        self.num_docs += 1
+
+        if len(self._terms) >= self.block_size:
+            self._flush_block()
+        return doc_id
+
+    def add_all(self, docs: Iterable[Dict]) -> int:
+        """Add every document from an iterable; returns the number indexed."""
+        added = 0
+        for doc in docs:
+            if self.add(doc) is not None:
+                added += 1
+                if added % 10000 == 0:
+                    print(f"[LOCAL INDEX] Indexed {added} documents...")
+        return added
+
+    def _flush_block(self) -> None:
+        """Sort the buffered postings by (term, doc) and spill them to disk."""
+        if not self._terms:
+            return
+        terms = np.frombuffer(self._terms, dtype=np.uint64)
+        docs = np.frombuffer(self._docs, dtype=np.uint32)
+        tfs = np.frombuffer(self._tfs, dtype=np.uint16)
+        order = np.lexsort((docs, terms))
+        np.savez(
+            os.path.join(self.block_dir, f'block_{self.block_count}.npz'),
+            terms=terms[order], docs=docs[order], tfs=tfs[order]
+        )
+        self.block_count += 1
+        self._terms = array('Q')
+        self._docs = array('I')
+        self._tfs = array('H')
+
+    def finish(self) -> Dict:
+        """Merge spilled blocks into the final index files and write metadata."""
+        self._flush_block()
+        self.docs_file.close()
+
+        block_paths = [os.path.join(self.block_dir, f'block_{i}.npz') for i in range(self.block_count)]
+
+        # Vocabulary and document frequencies across all blocks
+        vocab_parts = []
+        for path in block_paths:
+            with np.load(path) as block:
+                vocab_parts.append(np.unique(block['terms']))
+        term_hashes = np.unique(np.concatenate(vocab_parts)) if vocab_parts else np.empty(0, dtype=np.uint64)
+
+        doc_freqs = np.zeros(len(term_hashes), dtype=np.int64)
+        for path in block_paths:
+            with np.load(path) as block:
+                tids = np.searchsorted(term_hashes, block['terms'])
+                doc_freqs += np.bincount(tids, minlength=len(term_hashes))
+        term_offsets = np.zeros(len(term_hashes) + 1, dtype=np.int64)
+        np.cumsum(doc_freqs, out=term_offsets[1:])
+        total_postings = int(term_offsets[-1])
+
+        postings_docs = np.lib.format.open_memmap(
+            os.path.join(self.out_dir, 'postings_docs.npy'), mode='w+',
+            dtype=np.uint32, shape=(total_postings,)
+        )
+        postings_tf = np.lib.format.open_memmap(
+            os.path.join(self.out_dir, 'postings_tf.npy'), mode='w+',
+            dtype=np.uint16, shape=(total_postings,)
+        )
+
+        # Blocks hold increasing doc ids, so appending each block's run for a
+        # term after the previous blocks' runs keeps postings sorted by doc
+        cursor = term_offsets[:-1].copy()
+        for path in block_paths:
+            with np.load(path) as block:
+                tids = np.searchsorted(term_hashes, block['terms'])
+                run_tids, run_starts, run_lengths = np.unique(tids, return_index=True, return_counts=True)
+                rank_in_run = np.arange(len(tids)) - np.repeat(run_starts, run_lengths)
+                positions = cursor[tids] + rank_in_run
+                postings_docs[positions] = block['docs']
+                postings_tf[positions] = block['tfs']
+                cursor[run_tids] += run_lengths
+        postings_docs.flush()
+        postings_tf.flush()
+        del postings_docs, postings_tf
+
+        np.save(os.path.join(self.out_dir, 'term_hashes.npy'), term_hashes)
+        np.save(os.path.join(self.out_dir, 'term_offsets.npy'), term_offsets)
+        np.save(os.path.join(self.out_dir, 'doc_lengths.npy'), np.frombuffer(self.doc_lengths, dtype=np.uint32))
+        np.save(os.path.join(self.out_dir, 'doc_offsets.npy'), np.frombuffer(self.doc_offsets, dtype=np.int64))
+
+        meta = {
+            'version': INDEX_VERSION,
+            'build_id': uuid.uuid4().hex,  # Changes on every (re)build, even in place
+            'num_docs': self.num_docs,
+            'num_terms': len(term_hashes),
+            'num_postings': total_postings,
+            'avg_doc_length': self.total_tokens / self.num_docs if self.num_docs else 0.0
+        }
+        with open(os.path.join(self.out_dir, 'meta.json'), 'w') as f:
+            json.dump(meta, f, indent=2)
+
+        shutil.rmtree(self.block_dir, ignore_errors=True)
+        print(f"[LOCAL INDEX] Built index with {meta['num_docs']} documents, {meta['num_terms']} terms")
+        return meta
+
+
+class LocalIndex:
+    """Read-only view of an index built by LocalIndexBuilder."""
+
+    def __init__(self, index_dir: str):
+        self.index_dir = index_dir
+        meta_path = os.path.join(index_dir, 'meta.json')
+        with open(meta_path) as f:
+            self.meta = json.load(f)
+        if self.meta.get('version') != INDEX_VERSION:
+            raise ValueError(f"Unsupported local index version: {self.meta.get('version')}")
+
+        # Memory-mapped: opening only reads the array headers
+        def load(name: str) -> np.ndarray:
+            return np.load(os.path.join(index_dir, name), mmap_mode='r')
+
+        self.term_hashes = load('term_hashes.npy')
+        self.term_offsets = load('term_offsets.npy')
+        self.postings_docs = load('postings_docs.npy')
+        self.postings_tf = load('postings_tf.npy')
+        self.doc_lengths = load('doc_lengths.npy')
+        self.doc_offsets = load('doc_offsets.npy')
+
+        self._docs_file = open(os.path.join(index_dir, 'docs.bin'), 'rb')
+        if os.fstat(self._docs_file.fileno()).st_size:
+            self._docs = mmap.mmap(self._docs_file.fileno(), 0, access=mmap.ACCESS_READ)
+        else:
+            self._docs = b''
+
+        self.num_docs = self.meta['num_docs']
+        # Indexes built before build ids were written fall back to the metadata's mtime
+        self.build_id = self.meta.get('build_id') or str(os.path.getmtime(meta_path))
+        self.avg_doc_length = self.meta['avg_doc_length'] or 1.0
+
+    def get_document(self, doc_id: int) -> Dict:
+        """Load a stored document record."""
+        start, end = int(self.doc_offsets[doc_id]), int(self.doc_offsets[doc_id + 1])
+        return json.loads(self._docs[start:end].decode('utf-8'))
+
+    def _postings(self, term: str):
+        """Return (doc_ids, tfs) for a term, or None if it isn't indexed."""
+        h = np.uint64(term_hash(term))
+        i = int(np.searchsorted(self.term_hashes, h))
+        if i >= len(self.term_hashes) or self.term_hashes[i] != h:
+            return None
+        start, end = int(self.term_offsets[i]), int(self.term_offsets[i + 1])
+        return self.postings_docs[start:end], self.postings_tf[start:end]
+
+    def score(self, query: str):
+        """
+        BM25-score every document matching a query term.
+
+        Returns:
+            Tuple of (doc_ids, scores) as NumPy arrays
+        """
+        doc_parts = []
+        score_parts = []
+        for term in set(tokenize_query(query)):
+            postings = self._postings(term)
+            if postings is None:
+                continue
+            docs, tfs = postings
+            df = len(docs)
+            idf = math.log(1.0 + (self.num_docs - df + 0.5) / (df + 0.5))
+            tf = tfs.astype(np.float32)
+            norm = BM25_K1 * (1.0 - BM25_B + BM25_B * self.doc_lengths[docs] / self.avg_doc_length)
+            doc_parts.append(np.asarray(docs))
+            score_parts.append(idf * tf * (BM25_K1 + 1.0) / (tf + norm))
+
+        if not doc_parts:
+            return np.empty(0, dtype=np.uint32), np.empty(0, dtype=np.float32)
+
+        doc_ids, inverse = np.unique(np.concatenate(doc_parts), return_inverse=True)
+        scores = np.bincount(inverse, weights=np.concatenate(score_parts))
+        return doc_ids, scores
+
+    def search(self, query: str, top_k: int = 10) -> List[Dict]:
+        """
+        Retrieve the top_k documents for a query.
+
+        Returns:
+            List of result dicts shaped like extract_organic_results() output,
+            plus the stored document 'text'
+        """
+        doc_ids, scores = self.score(query)
+        results = []
+        for position, i in enumerate(select_top_k(scores, top_k), start=1):
+            doc = self.get_document(int(doc_ids[i]))
+            results.append({
+                'title': doc['title'],
+                'url': doc['url'],
+                'domain': doc['domain'],
+                'snippet': doc.get('snippet') or '',
+                'text': doc['text'],
+                'raw_meta': {
+                    'position': position,
+                    'date': doc.get('date', ''),
+                    'source': 'local',
+                    'bm25_score': round(float(scores[i]), 4)
+                }
+            })
+        return results
+
+
+_local_index: Optional[LocalIndex] = None
+_local_index_stamp = None
+_local_index_lock = threading.Lock()
+
+
+def _meta_stamp(index_dir: str):
+    """Identity of an index directory's meta.json; changes when a rebuild is swapped in."""
+    stat = os.stat(os.path.join(index_dir, 'meta.json'))
+    return stat.st_ino, stat.st_mtime_ns
+
+
+def get_local_index() -> LocalIndex:
+    """
+    Return the shared index for LOCAL_INDEX_DIR, reopening it after a rebuild.
+
+    Searches still running on the previous instance keep their memory maps
+    of the replaced files. If the new index can't be opened (e.g. while
+    build_index swaps directories), the previous instance is kept.
+    """
+    global _local_index, _local_index_stamp
+    if not LOCAL_INDEX_DIR:
+        raise ValueError("LOCAL_INDEX_DIR environment variable not set")
+    try:
+        stamp = _meta_stamp(LOCAL_INDEX_DIR)
+    except OSError:
+        if _local_index is None:
+            raise
+        return _local_index
+    if _local_index is None or stamp != _local_index_stamp:
+        with _local_index_lock:
+            if _local_index is None or stamp != _local_index_stamp:
+                try:
+                    index = LocalIndex(LOCAL_INDEX_DIR)
+                except (OSError, ValueError):
+                    if _local_index is None:
+                        raise
+                    return _local_index
+                _local_index, _local_index_stamp = index, stamp
+                print(f"[LOCAL INDEX] Opened {LOCAL_INDEX_DIR} ({index.num_docs} documents, build {index.build_id})")
+    return _local_index
+
+
+def iter_jsonl(path: str) -> Iterator[Dict]:
+    """Read documents from a JSONL dump, skipping malformed lines."""
+    with open(path, encoding='utf-8') as f:
+        for line_no, line in enumerate(f, start=1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError as e:
+                print(f"[LOCAL INDEX] Skipping line {line_no} of {path}: {e}")
+
+
+def iter_fetched(urls: Iterable[str], batch_size: int = 32) -> Iterator[Dict]:
+    """Fetch and extract pages in batches, yielding documents for those with text."""
+    batch = []
+    for url in urls:
+        url = url.strip()
+        if url:
+            batch.append(url)
+        if len(batch) >= batch_size:
+            yield from _fetched_documents(batch)
+            batch = []
+    if batch:
+        yield from _fetched_documents(batch)
+
+
+def _fetched_documents(urls: List[str]) -> Iterator[Dict]:
+    for url, page in fetch_and_extract_many(urls).items():
+        if page.get('preview_unavailable') or not page.get('text'):
+            continue
+        yield {
+            'url': url,
+            'title': url,
+            'text': page['text'],
+            'snippet': page.get('snippet')
+        }
+
+
+def build_index(docs: Iterable[Dict], out_dir: str, block_size: int = 2_000_000) -> Dict:
+    """
+    Build an index for out_dir from an iterable of documents.
+
+    The index is built in a sibling staging directory and then renamed to
+    out_dir, so a service with the previous index memory-mapped keeps
+    reading intact files (rewriting them in place would crash it with
+    SIGBUS) and picks up the new index on its next search.
+    """
+    out_dir = os.path.normpath(out_dir)
+    staging = f"{out_dir}.building-{uuid.uuid4().hex[:8]}"
+    os.makedirs(staging)
+    try:
+        builder = LocalIndexBuilder(staging, block_size=block_size)
+        builder.add_all(docs)
+        meta = builder.finish()
+    except BaseException:
+        shutil.rmtree(staging, ignore_errors=True)
+        raise
+    _swap_in(staging, out_dir)
+    return meta
+
+
+def _swap_in(staging: str, out_dir: str) -> None:
+    """Replace out_dir with the staging directory."""
+    if not os.path.exists(out_dir):
+        os.replace(staging, out_dir)
+        return
+    # Directories can't be replaced in one rename: move the old one aside
+    # first. Its files stay valid for open memory maps until they're closed.
+    retired = f"{out_dir}.old-{uuid.uuid4().hex[:8]}"
+    os.replace(out_dir, retired)
+    try:
+        os.replace(staging, out_dir)
+    except OSError:
+        os.replace(retired, out_dir)
+        raise
+    shutil.rmtree(retired, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build a local ChatRank search index.")
+    parser.add_argument('--out', required=True, help="Directory to write the index to")
+    parser.add_argument('--jsonl', action='append', default=[], help="JSONL dump with url/title/text fields")
+    parser.add_argument('--urls', help="File with one URL per line to fetch and index")
+    parser.add_argument('--block-size', type=int, default=2_000_000, help="Postings buffered in memory per block")
+    args = parser.parse_args()
+
+    def documents() -> Iterator[Dict]:
+        for path in args.jsonl:
+            yield from iter_jsonl(path)
+        if args.urls:
+            with open(args.urls) as f:
+                yield from iter_fetched(f)
+
+    build_index(documents(), args.out, block_size=args.block_size)
+
+
+if __name__ == '__main__':
+    main()
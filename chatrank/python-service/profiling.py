@@ -0,0 +1,368 @@
+"""
+Opt-in profiling of live requests (cProfile or stack sampling) and memory snapshots.
+
+Off by default: unless PROFILING_ENABLED=1 the middleware isn't installed and
+profiled()/propagate() return functions unchanged.
+"""
+import contextvars
+import cProfile
+import functools
+import os
+import pstats
+import re
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+import uuid
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, List, Optional
+
+PROFILING_ENABLED = os.getenv('PROFILING_ENABLED', '0') == '1'
+# Required in X-Profile-Token for profiling and /debug endpoints when set
+PROFILING_TOKEN = os.getenv('PROFILING_TOKEN') or None
+PROFILE_DIR = os.getenv('PROFILE_DIR') or os.path.join(tempfile.gettempdir(), 'chatrank-profiles')
+PROFILE_KEEP = int(os.getenv('PROFILE_KEEP', 20))  # Older profile files are deleted
+PROFILE_SAMPLE_INTERVAL_SECONDS = float(os.getenv('PROFILE_SAMPLE_INTERVAL_SECONDS', 0.005))
+
+PROFILE_MODES = ('cprofile', 'sample')
+PROFILE_EXTENSIONS = {'cprofile': '.prof', 'sample': '.folded'}
+_PROFILE_ID = re.compile(r'^[0-9a-f]{16}$')
+
+# Python 3.12+ cProfile uses the interpreter-wide sys.monitoring hook: one
+# profiler sees every thread, and no second profiler can be enabled meanwhile
+SHARED_PROFILER = sys.version_info >= (3, 12)
+_shared_profiler_lock = threading.Lock()
+
+# Profile of the request being handled, if any (copied into the endpoint's thread)
+_active_profile: contextvars.ContextVar = contextvars.ContextVar('active_profile', default=None)
+
+
+class RequestProfile:
+    """
+    Profile of one request across the threads it runs on.
+
+    'cprofile' writes one pstats file (.prof: snakeviz, gprof2dot, flameprof).
+    Before Python 3.12 a cProfile.Profile runs in every tracked thread and
+    they are merged. From 3.12 one profiler covers the whole process for the
+    duration of the request (so it also sees concurrent requests); only one
+    such profile runs at a time, and a request that can't get it (or finds
+    another profiling tool active) is sampled instead. 'sample' samples the
+    tracked threads' stacks every PROFILE_SAMPLE_INTERVAL_SECONDS into
+    collapsed stacks (.folded: flamegraph.pl, speedscope).
+
+    Profiling problems are logged, never raised into the request.
+    """
+
+    def __init__(self, mode: str, label: str):
+        self.id = uuid.uuid4().hex[:16]
+        self.mode = mode
+        self.label = label
+        self.threads = set()  # Idents of threads currently doing work for the request
+        self.profilers: List[cProfile.Profile] = []
+        self.stacks: Counter = Counter()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._sampler: Optional[threading.Thread] = None
+        self._shared: Optional[cProfile.Profile] = None
+
+    @contextmanager
+    def track(self):
+        """Profile the current thread for the duration of the block."""
+        ident = threading.get_ident()
+        with self._lock:
+            nested = ident in self.threads
+            self.threads.add(ident)
+        if nested:
+            yield
+            return
+
+        profiler = None
+        if self.mode == 'cprofile' and not SHARED_PROFILER:
+            profiler = cProfile.Profile()
+            try:
+                profiler.enable()
+            except ValueError as e:
+                print(f"[PROFILE] Can't profile thread: {e}")
+                profiler = None
+        try:
+            yield
+        finally:
+            if profiler is not None:
+                profiler.disable()
+            with self._lock:
+                self.threads.discard(ident)
+                if profiler is not None:
+                    self.profilers.append(profiler)
+
+    def start(self) -> None:
+        if self.mode == 'cprofile' and SHARED_PROFILER:
+            self._start_shared()
+        if self.mode == 'sample':
+            self._sampler = threading.Thread(target=self._sample, name=f"profile-{self.id}", daemon=True)
+            self._sampler.start()
+
+    def _start_shared(self) -> None:
+        """Enable the process-wide profiler, or fall back to sampling."""
+        if not _shared_profiler_lock.acquire(blocking=False):
+            print(f"[PROFILE] cProfile busy with another request, sampling {self.label} instead")
+            self.mode = 'sample'
+            return
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError as e:
+            # Another tool (debugger, coverage) owns the profiling hook
+            _shared_profiler_lock.release()
+            print(f"[PROFILE] {e}, sampling {self.label} instead")
+            self.mode = 'sample'
+            return
+        self._shared = profiler
+
+    def _sample(self) -> None:
+        while not self._stop.wait(PROFILE_SAMPLE_INTERVAL_SECONDS):
+            frames = sys._current_frames()
+            with self._lock:
+                idents = list(self.threads)
+            for ident in idents:
+                frame = frames.get(ident)
+                if frame is not None:
+                    self.stacks[_collapse(frame)] += 1
+
+    def finish(self) -> Optional[str]:
+        """Stop profiling and write the profile file; returns its path."""
+        if self._sampler is not None:
+            self._stop.set()
+            self._sampler.join()
+        if self._shared is not None:
+            self._shared.disable()
+            self.profilers.append(self._shared)
+            self._shared = None
+            _shared_profiler_lock.release()
+        os.makedirs(PROFILE_DIR, exist_ok=True)
+        path = os.path.join(PROFILE_DIR, f"{self.id}{PROFILE_EXTENSIONS[self.mode]}")
+        if self.mode == 'cprofile':
+            if not self.profilers:
+                return None
+            stats = pstats.Stats(self.profilers[0])
+            for profiler in self.profilers[1:]:
+                stats.add(profiler)
+            stats.dump_stats(path)
+        else:
+            with open(path, 'w') as f:
+                for stack, count in self.stacks.most_common():
+                    f.write(f"{stack} {count}\n")
+        print(f"[PROFILE] {self.label} -> {path}")
+        _prune_profiles()
+        return path
+
+
+def _collapse(frame) -> str:
+    """Stack of a frame, root first, in collapsed (folded) format."""
+    labels = []
+    while frame is not None:
+        code = frame.f_code
+        labels.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+        frame = frame.f_back
+    return ';'.join(reversed(labels))
+
+
+def _prune_profiles() -> None:
+    files = list_profiles()
+    for info in files[PROFILE_KEEP:]:
+        try:
+            os.remove(info['path'])
+        except OSError:
+            pass
+
+
+def list_profiles() -> List[Dict[str, Any]]:
+    """Stored profile files, newest first."""
+    if not os.path.isdir(PROFILE_DIR):
+        return []
+    files = []
+    for name in os.listdir(PROFILE_DIR):
+        profile_id, ext = os.path.splitext(name)
+        if _PROFILE_ID.match(profile_id) and ext in PROFILE_EXTENSIONS.values():
+            path = os.path.join(PROFILE_DIR, name)
+            stat = os.stat(path)
+            files.append({'id': profile_id, 'path': path, 'bytes': stat.st_size, 'created': stat.st_mtime})
+    return sorted(files, key=lambda info: info['created'], reverse=True)
+
+
+def find_profile(profile_id: str) -> Optional[str]:
+    """Path of a stored profile, or None."""
+    if not _PROFILE_ID.match(profile_id):
+        return None
+    for ext in PROFILE_EXTENSIONS.values():
+        path = os.path.join(PROFILE_DIR, profile_id + ext)
+        if os.path.exists(path):
+            return path
+    return None
+
+
+def profile_summary(path: str, sort: str = 'cumulative', limit: int = 30) -> str:
+    """Text report of the top functions in a .prof file."""
+    from io import StringIO
+    out = StringIO()
+    pstats.Stats(path, stream=out).sort_stats(sort).print_stats(limit)
+    return out.getvalue()
+
+
+def profiled(fn: Callable) -> Callable:
+    """Decorate a sync endpoint so it runs under the request's profile, if any."""
+    if not PROFILING_ENABLED:
+        return fn
+
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        profile = _active_profile.get()
+        if profile is None:
+            return fn(*args, **kwargs)
+        with profile.track():
+            return fn(*args, **kwargs)
+    return wrapper
+
+
+def propagate(fn: Callable) -> Callable:
+    """Bind fn to the current request's profile before handing it to another thread."""
+    if not PROFILING_ENABLED:
+        return fn
+    profile = _active_profile.get()
+    if profile is None:
+        return fn
+
+    @functools.wraps(fn)
+    def run(*args, **kwargs):
+        with profile.track():
+            return fn(*args, **kwargs)
+    return run
+
+
+def check_token(token: Optional[str]) -> bool:
+    return PROFILING_TOKEN is None or token == PROFILING_TOKEN
+
+
+class ProfilingMiddleware:
+    """
+    ASGI middleware profiling requests that send `X-Profile: cprofile|sample`.
+
+    The profile id is returned in the X-Profile-Id response header and the
+    mode actually used (cprofile may fall back to sample) in X-Profile-Mode.
+    """
+
+    def __init__(self, app, paths: List[str]):
+        self.app = app
+        self.paths = set(paths)
+
+    async def __call__(self, scope, receive, send):
+        mode = None
+        if scope['type'] == 'http' and scope['path'] in self.paths:
+            headers = dict(scope['headers'])
+            mode = headers.get(b'x-profile', b'').decode('latin-1').strip().lower() or None
+        if mode is None:
+            await self.app(scope, receive, send)
+            return
+
+        error = None
+        if not check_token(headers.get(b'x-profile-token', b'').decode('latin-1') or None):
+            error = (403, "Invalid or missing X-Profile-Token")
+        elif mode not in PROFILE_MODES:
+            error = (400, f"Unknown profile mode: {mode}. Available: {', '.join(PROFILE_MODES)}")
+        if error is not None:
+            # Imported here: extraction worker processes import this module via fetcher
+            from fastapi.responses import JSONResponse
+            await JSONResponse(status_code=error[0], content={'detail': error[1]})(scope, receive, send)
+            return
+
+        profile = RequestProfile(mode, f"{scope['method']} {scope['path']}")
+
+        async def send_with_id(message):
+            if message['type'] == 'http.response.start':
+                message.setdefault('headers', [])
+                message['headers'] = list(message['headers']) + [
+                    (b'x-profile-id', profile.id.encode()),
+                    (b'x-profile-mode', profile.mode.encode())
+                ]
+            await send(message)
+
+        token = _active_profile.set(profile)
+        profile.start()
+        try:
+            await self.app(scope, receive, send_with_id)
+        finally:
+            _active_profile.reset(token)
+            try:
+                profile.finish()
+            except Exception as e:
+                print(f"[PROFILE] Failed to write profile {profile.id}: {e}")
+
+
+def deep_sizeof(obj: Any, seen: Optional[set] = None) -> int:
+    """Approximate memory held by an object and everything it references."""
+    if seen is None:
+        seen = set()
+    if id(obj) in seen:
+        return 0
+    seen.add(id(obj))
+    nbytes = getattr(obj, 'nbytes', None)  # numpy arrays
+    if isinstance(nbytes, int):
+        return sys.getsizeof(obj) + (0 if getattr(obj, 'base', None) is not None else nbytes)
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        size += sum(deep_sizeof(k, seen) + deep_sizeof(v, seen) for k, v in obj.items())
+    elif isinstance(obj, (list, tuple, set, frozenset)):
+        size += sum(deep_sizeof(item, seen) for item in obj)
+    return size
+
+
+def cache_memory(cache) -> Dict[str, Dict[str, int]]:
+    """Entries and approximate bytes per prefix of a Cache."""
+    stats = defaultdict(lambda: {'entries': 0, 'bytes': 0})
+    for entry in list(cache.cache.values()):
+        prefix_stats = stats[entry.get('prefix', 'unknown')]
+        prefix_stats['entries'] += 1
+        prefix_stats['bytes'] += deep_sizeof(entry['data'])
+    return dict(stats)
+
+
+def start_tracemalloc(frames: int = 1) -> None:
+    if not tracemalloc.is_tracing():
+        tracemalloc.start(frames)
+        print(f"[PROFILE] tracemalloc started ({frames} frames)")
+
+
+def stop_tracemalloc() -> None:
+    if tracemalloc.is_tracing():
+        tracemalloc.stop()
+        print("[PROFILE] tracemalloc stopped")
+
+
+def tracemalloc_report(limit: int = 20, group_by: str = 'lineno') -> Dict[str, Any]:
+    """Top allocation sites of a tracemalloc snapshot (tracing must be started)."""
+    if not tracemalloc.is_tracing():
+        return {'tracing': False}
+    start = time.perf_counter()
+    snapshot = tracemalloc.take_snapshot().filter_traces((
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, '<frozen importlib._bootstrap>'),
+        tracemalloc.Filter(False, '<frozen importlib._bootstrap_external>'),
+    ))
+    current, peak = tracemalloc.get_traced_memory()
+    top = [
+        {
+            'location': str(stat.traceback),
+            'size_kib': round(stat.size / 1024, 1),
+            'count': stat.count
+        }
+        for stat in snapshot.statistics(group_by)[:limit]
+    ]
+    return {
+        'tracing': True,
+        'current_kib': round(current / 1024, 1),
+        'peak_kib': round(peak / 1024, 1),
+        'snapshot_seconds': round(time.perf_counter() - start, 3),
+        'top': top
+    }
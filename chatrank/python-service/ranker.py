@@ -2,9 +2,7 @@
 TF-IDF ranking logic: cosine similarity and TF-IDF term score computation.
 """
 import numpy as np
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
-from typing import List, Dict, Tuple
+from typing import List, Dict, Optional, Tuple
 import re
 
 def tokenize_query(query: str) -> List[str]:
@@ -43,6 +41,10 @@ def compute_ranking_metrics(
     if not valid_docs:
         return [0.0] * len(documents), [0.0] * len(documents), [0.0] * len(documents)
     
+    # Imported lazily: scikit-learn dominates the service's import time
+    from sklearn.feature_extraction.text import TfidfVectorizer
+    from sklearn.metrics.pairwise import cosine_similarity
+    
     # Build TF-IDF vectorizer
     vectorizer = TfidfVectorizer(
         stop_words='english',
@@ -62,30 +64,21 @@ def compute_ranking_metrics(
     # Compute TF-IDF term score for each document
     # For each query token, sum its TF-IDF value in the document
     query_tokens = tokenize_query(query)
-    tfidf_term_scores = []
     
+    # Weight each feature by how many query tokens it contains (unigram or
+    # bigram), then score all documents with one sparse mat-vec product
     feature_names = vectorizer.get_feature_names_out()
-    query_vector_dense = query_vector.toarray()[0]
-    doc_vectors_dense = doc_vectors.toarray()
-    
-    for doc_vec in doc_vectors_dense:
-        score = 0.0
-        matched_terms = 0
-        
-        for token in query_tokens:
-            # Check if token exists in vocabulary (possibly as n-gram)
-            for i, feature in enumerate(feature_names):
-                if token in feature:  # Token is part of this feature (could be unigram or bigram)
-                    score += doc_vec[i]
-                    matched_terms += 1
-        
-        # Normalize by number of query terms (or matched terms if any)
-        if matched_terms > 0:
-            score = score / len(query_tokens)  # Normalize by query length
-        else:
-            score = 0.0
-        
-        tfidf_term_scores.append(score)
+    term_weights = np.zeros(len(feature_names), dtype=np.float64)
+    for token in query_tokens:
+        for i, feature in enumerate(feature_names):
+            if token in feature:
+                term_weights[i] += 1.0
+    
+    if term_weights.any():
+        # Normalize by query length
+        tfidf_term_scores = doc_vectors.dot(term_weights) / len(query_tokens)
+    else:
+        tfidf_term_scores = np.zeros(len(valid_docs), dtype=np.float64)
     
     # Create full lists with zeros for invalid documents
     full_cosine = [0.0] * len(documents)
@@ -125,38 +118,99 @@ def normalize_scores(scores: List[float]) -> List[float]:
     normalized = [(s - min_score) / (max_score - min_score) for s in scores]
     return normalized
 
+def select_top_k(scores: np.ndarray, k: Optional[int] = None) -> np.ndarray:
+    """
+    Return the indices of the k highest scores, best first.
+
+    Uses a partial sort (argpartition) so only the selected k candidates are
+    fully ordered. Ties keep their original order, matching a stable sort.
+    """
+    scores = np.asarray(scores, dtype=np.float64)
+    n = scores.shape[0]
+    if k is None or k >= n:
+        candidates = np.arange(n)
+    elif k <= 0:
+        return np.empty(0, dtype=np.intp)
+    else:
+        # k-th best score; everything above it is in, ties are taken in order
+        kth_score = scores[np.argpartition(-scores, k - 1)[k - 1]]
+        above = np.flatnonzero(scores > kth_score)
+        tied = np.flatnonzero(scores == kth_score)[:k - above.shape[0]]
+        candidates = np.concatenate((above, tied))
+    # Sort the selection by score (descending), then by original position
+    order = np.lexsort((candidates, -scores[candidates]))
+    return candidates[order]
+
+def compute_score_vectors(query: str, results: List[Dict]) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Fit the ranking model once and return the normalized score vectors.
+    
+    Returns:
+        Tuple of (cosine_scores, tfidf_term_scores) arrays aligned with results;
+        any alpha can then be applied with rank_by_scores() without refitting
+    """
+    # Extract document texts
+    documents = [r.get('text', '') or '' for r in results]
+    
+    cosine_scores, tfidf_scores, _ = compute_ranking_metrics(query, documents)
+    return np.asarray(cosine_scores, dtype=np.float64), np.asarray(tfidf_scores, dtype=np.float64)
+
+def rank_by_scores(
+    results: List[Dict],
+    cosine_scores: np.ndarray,
+    tfidf_scores: np.ndarray,
+    alpha: float = 0.6,
+    top_k: Optional[int] = None,
+    copy: bool = False
+) -> List[Dict]:
+    """
+    Combine precomputed score vectors for alpha and select the top_k results.
+    
+    Args:
+        results: Result dicts aligned with the score vectors
+        cosine_scores: Normalized cosine scores
+        tfidf_scores: Normalized TF-IDF term scores
+        alpha: Weight for combined score (alpha * cosine + (1-alpha) * tfidf)
+        top_k: Only keep the top_k highest scoring results (all if None)
+        copy: Return scored copies, leaving results untouched (for shared state)
+    
+    Returns:
+        List of the selected results, best first, with added
+        'cosine_score', 'tfidf_term_score', 'combined_score'
+    """
+    # Rank on rounded scores so ordering matches the scores clients see
+    combined_arr = np.round(alpha * cosine_scores + (1 - alpha) * tfidf_scores, 4)
+    cosine_arr = np.round(cosine_scores, 4)
+    tfidf_arr = np.round(tfidf_scores, 4)
+    
+    ranked = []
+    for i in select_top_k(combined_arr, top_k):
+        result = dict(results[i]) if copy else results[i]
+        result['cosine_score'] = float(cosine_arr[i])
+        result['tfidf_term_score'] = float(tfidf_arr[i])
+        result['combined_score'] = float(combined_arr[i])
+        ranked.append(result)
+    
+    return ranked
+
 def rank_documents(
     query: str,
     results: List[Dict],
-    alpha: float = 0.6
+    alpha: float = 0.6,
+    top_k: Optional[int] = None
 ) -> List[Dict]:
     """
-    Rank documents by computing metrics and sorting by combined score.
+    Rank documents by computing metrics and selecting the best by combined score.
     
     Args:
         query: Search query
         results: List of result dicts with 'text' field
         alpha: Weight for combined score
+        top_k: Only keep the top_k highest scoring results (all if None)
     
     Returns:
-        List of results with added 'cosine_score', 'tfidf_term_score', 'combined_score'
+        New list of the selected results, best first, with added
+        'cosine_score', 'tfidf_term_score', 'combined_score'
     """
-    # Extract document texts
-    documents = [r.get('text', '') or '' for r in results]
-    
-    # Compute metrics
-    cosine_scores, tfidf_scores, combined_scores = compute_ranking_metrics(
-        query, documents, alpha
-    )
-    
-    # Add scores to results
-    for i, result in enumerate(results):
-        result['cosine_score'] = round(cosine_scores[i], 4)
-        result['tfidf_term_score'] = round(tfidf_scores[i], 4)
-        result['combined_score'] = round(combined_scores[i], 4)
-    
-    # Sort by combined score (descending)
-    results.sort(key=lambda x: x['combined_score'], reverse=True)
-    
-    return results
-
+    cosine_scores, tfidf_scores = compute_score_vectors(query, results)
+    return rank_by_scores(results, cosine_scores, tfidf_scores, alpha, top_k)
@@ -2,53 +2,107 @@
 SerpApi integration for fetching search results.
 """
 import os
+import time
 import requests
 from typing import List, Dict, Optional
+from breaker import CircuitBreaker
 from cache import cache
 
 SERPAPI_KEY = os.getenv('SERPAPI_KEY')
 SERPAPI_URL = 'https://serpapi.com/search'
 
+# Trips on network errors, rate limits and 5xx; the timeout adapts to observed latency
+serpapi_breaker = CircuitBreaker(
+    'SerpApi',
+    min_timeout=float(os.getenv('SERPAPI_TIMEOUT_MIN_SECONDS', 3)),
+    max_timeout=float(os.getenv('SERPAPI_TIMEOUT_MAX_SECONDS', 10))
+)
+
+SERPAPI_PAGE_SIZE = 100  # Google engine returns at most 100 results per call
+
 def search_serpapi(query: str, num_results: int = 5) -> Dict:
     """
     Fetch search results from SerpApi.
     
+    Requests for more than SERPAPI_PAGE_SIZE results are fetched in several
+    pages (using 'start') and merged into a single response.
+    
     Returns:
         Dict with 'organic_results' list or 'no_results': True
     """
     if not SERPAPI_KEY:
         raise ValueError("SERPAPI_KEY environment variable not set")
     
-    # Check cache first
-    cached = cache.get('serpapi', query)
+    # Check cache first (keyed by result count so larger requests aren't
+    # answered from a smaller cached response)
+    cache_key = serpapi_cache_key(query, num_results)
+    cached = cache.get('serpapi', cache_key)
     if cached:
         return cached
     
+    data = None
+    start = 0
+    while start < num_results:
+        page = _fetch_serpapi_page(query, min(SERPAPI_PAGE_SIZE, num_results - start), start)
+        page_results = page.get('organic_results', [])
+        if data is None:
+            data = page
+        else:
+            data.setdefault('organic_results', []).extend(page_results)
+        if len(page_results) < SERPAPI_PAGE_SIZE:
+            break  # No more results available
+        start += SERPAPI_PAGE_SIZE
+    
+    # Cache the response
+    cache.set('serpapi', cache_key, data)
+    
+    return data
+
+def serpapi_cache_key(query: str, num_results: int) -> str:
+    """Cache key of a SerpApi response (prefix 'serpapi')."""
+    return f"{query}|{num_results}"
+
+def _fetch_serpapi_page(query: str, num: int, start: int = 0) -> Dict:
+    """Fetch a single page of results from SerpApi."""
     params = {
         'q': query,
         'api_key': SERPAPI_KEY,
         'engine': 'google',
-        'num': num_results
+        'num': num
     }
+    if start:
+        params['start'] = start
     
+    # Raises CircuitOpenError while SerpApi is failing
+    serpapi_breaker.before_call()
+    start_time = time.monotonic()
     try:
-        response = requests.get(SERPAPI_URL, params=params, timeout=10)
+        response = requests.get(SERPAPI_URL, params=params, timeout=serpapi_breaker.timeout())
         response.raise_for_status()
         data = response.json()
-        
-        # Check for rate limit
-        if 'error' in data:
-            error_msg = data.get('error', 'Unknown error')
-            if 'rate limit' in error_msg.lower() or '429' in str(data.get('status_code', '')):
-                raise Exception("SerpApi rate limit reached. Please try again later.")
-            raise Exception(f"SerpApi error: {error_msg}")
-        
-        # Cache the response
-        cache.set('serpapi', query, data)
-        
-        return data
     except requests.exceptions.RequestException as e:
+        # Network errors, timeouts, 429 and 5xx count against SerpApi's health
+        status = getattr(getattr(e, 'response', None), 'status_code', None)
+        if status is None or status == 429 or status >= 500:
+            serpapi_breaker.record_failure()
+        else:
+            serpapi_breaker.record_success()
         raise Exception(f"Failed to fetch from SerpApi: {str(e)}")
+    
+    # Check for rate limit
+    if 'error' in data:
+        error_msg = data.get('error', 'Unknown error')
+        if 'rate limit' in error_msg.lower() or '429' in str(data.get('status_code', '')):
+            serpapi_breaker.record_failure()
+            raise Exception("SerpApi rate limit reached. Please try again later.")
+        serpapi_breaker.record_success(time.monotonic() - start_time)
+        if start and not data.get('organic_results'):
+            # Ran past the last page of results
+            return {'organic_results': []}
+        raise Exception(f"SerpApi error: {error_msg}")
+    
+    serpapi_breaker.record_success(time.monotonic() - start_time)
+    return data
 
 def extract_organic_results(serpapi_response: Dict) -> List[Dict]:
     """
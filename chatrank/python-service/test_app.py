@@ -0,0 +1,173 @@
+"""
+API tests: readiness, HTTP caching of /search and /chatbot, and result fields.
+"""
+import os
+import subprocess
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import pytest
+from fastapi.testclient import TestClient
+import app as app_module
+import llm
+import local_index
+from cache import Cache
+from local_index import build_index
+
+DOCS = [
+    {'url': f'https://example.com/{i}', 'title': f'Doc {i}',
+     'text': f'Machine learning document number {i} about learning from data.'}
+    for i in range(8)
+]
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    """Local-index searches with empty caches and a cached Gemini answer for 'machine learning'."""
+    index_dir = str(tmp_path / 'index')
+    build_index(DOCS, index_dir)
+    monkeypatch.setattr(local_index, 'LOCAL_INDEX_DIR', index_dir)
+    monkeypatch.setattr(local_index, '_local_index', None)
+    cache = Cache(ttl_seconds=3600)
+    monkeypatch.setattr(app_module, 'cache', cache)
+    monkeypatch.setattr(llm, 'cache', cache)
+    monkeypatch.setattr(app_module, 'result_sets', Cache(ttl_seconds=1800))
+    monkeypatch.setattr(llm, 'GEMINI_API_KEY', 'test-key')
+    cache.set('gemini', 'machine learning', 'Machine learning is learning from data.')
+    client = TestClient(app_module.app)
+    client.index_dir = index_dir
+    return client
+
+HEAVY_MODULES = ('sklearn', 'bs4', 'newspaper', 'google.generativeai', 'rapidfuzz')
+
+def test_import_leaves_heavy_dependencies_unloaded():
+    """Test that importing the app doesn't import the slow dependencies (they load during warm-up)."""
+    code = f"import sys, app; print([m for m in {HEAVY_MODULES!r} if m in sys.modules])"
+    output = subprocess.run(
+        [sys.executable, '-c', code], cwd=os.path.dirname(os.path.abspath(__file__)),
+        capture_output=True, text=True, check=True
+    ).stdout
+    assert output.strip().splitlines()[-1] == '[]'
+
+@pytest.fixture
+def lifecycle(monkeypatch):
+    """Fresh readiness state, and a ranking pool the shutdown handler may stop."""
+    monkeypatch.setattr(app_module, 'service_ready', threading.Event())
+    monkeypatch.setattr(app_module, 'ranking_executor', ThreadPoolExecutor(max_workers=1))
+    monkeypatch.setattr(app_module, 'shutdown_extraction_pool', lambda: None)
+
+def test_ready_after_warm_up(lifecycle, monkeypatch):
+    """Test that /ready is 503 until warm-up finishes while /health answers throughout."""
+    warm_up_done = threading.Event()
+    finish_warm_up = threading.Event()
+
+    def fake_warm_up():
+        finish_warm_up.wait(5)
+        app_module.service_ready.set()
+        warm_up_done.set()
+
+    monkeypatch.setattr(app_module, 'WARMUP_ON_STARTUP', True)
+    monkeypatch.setattr(app_module, 'warm_up', fake_warm_up)
+    with TestClient(app_module.app) as client:
+        warming = client.get('/ready')
+        assert warming.status_code == 503
+        assert warming.json()['status'] == 'warming_up'
+        assert client.get('/health').status_code == 200
+
+        finish_warm_up.set()
+        assert warm_up_done.wait(5)
+        assert client.get('/ready').status_code == 200
+
+def test_ready_without_warm_up(lifecycle, monkeypatch):
+    """Test that /ready answers 200 right away when warm-up is disabled."""
+    monkeypatch.setattr(app_module, 'WARMUP_ON_STARTUP', False)
+    monkeypatch.setattr(app_module, 'warm_up', lambda: pytest.fail("warm-up ran"))
+    with TestClient(app_module.app) as client:
+        assert client.get('/ready').status_code == 200
+
+def search(client, headers=None, **body):
+    return client.post('/search', json=dict({'query': 'machine learning', 'source': 'local'}, **body),
+                       headers=headers or {})
+
+def test_search_if_none_match(client):
+    """Test that a repeated search answers 304 for a matching ETag and 200 otherwise."""
+    first = search(client)
+    assert first.status_code == 200
+    etag = first.headers['etag']
+    assert first.headers['cache-control'].startswith('public, max-age=')
+
+    assert search(client, {'If-None-Match': etag}).status_code == 304
+    miss = search(client, {'If-None-Match': 'W/"stale"'})
+    assert miss.status_code == 200
+    assert miss.headers['etag'] == etag
+    assert miss.json()['result_set_id'] == first.json()['result_set_id']
+
+    other_alpha = search(client, {'If-None-Match': etag}, alpha=0.2)
+    assert other_alpha.status_code == 200
+    assert other_alpha.headers['etag'] != etag
+
+def test_search_etag_changes_after_index_rebuild(client):
+    """Test that rebuilding the served local index invalidates ETags without a restart."""
+    etag = search(client).headers['etag']
+
+    build_index(DOCS, client.index_dir)
+
+    response = search(client, {'If-None-Match': etag})
+    assert response.status_code == 200
+    assert response.headers['etag'] != etag
+
+def test_degraded_search_is_not_cacheable(client, monkeypatch):
+    """Test that a fallback answer (Gemini unavailable) gets no-cache and no ETag."""
+    monkeypatch.setattr(llm, 'GEMINI_API_KEY', None)
+
+    response = search(client, query='learning from data')
+    assert response.status_code == 200
+    assert response.headers['cache-control'] == 'no-cache'
+    assert 'etag' not in response.headers
+    assert "Gemini couldn't provide an answer" in response.json()['ai_answer']
+
+def test_chatbot_etag(client):
+    """Test that cached chatbot answers carry an ETag and revalidate to 304."""
+    first = client.post('/chatbot', json={'query': 'machine learning'})
+    assert first.status_code == 200
+    assert first.json()['answer'] == 'Machine learning is learning from data.'
+    etag = first.headers['etag']
+
+    repeat = client.post('/chatbot', json={'query': 'Machine Learning'}, headers={'If-None-Match': etag})
+    assert repeat.status_code == 304
+    assert repeat.headers['etag'] == etag
+
+def test_fields_projection(client):
+    """Test that only the requested fields are returned, in search and rerank pages."""
+    fields = ['title', 'url', 'combined_score']
+    response = search(client, fields=fields)
+    assert response.status_code == 200
+    results = response.json()['results']
+    assert results and all(list(result) == fields for result in results)
+
+    rerank = client.post('/rerank', json={
+        'result_set_id': response.json()['result_set_id'], 'ranking': 'tfidf', 'fields': ['url']
+    })
+    assert rerank.status_code == 200
+    assert all(list(result) == ['url'] for result in rerank.json()['results'])
+
+def test_fields_unknown_or_empty_rejected(client):
+    """Test that unknown field names and an empty field list are 400s."""
+    unknown = search(client, fields=['title', 'bogus'])
+    assert unknown.status_code == 400
+    assert 'bogus' in unknown.json()['detail']
+
+    assert search(client, fields=[]).status_code == 400
+    assert client.post('/rerank', json={'result_set_id': 'x', 'fields': ['bogus']}).status_code == 400
+
+def test_direct_responses_match_response_model(client):
+    """Test that directly encoded responses (which bypass response_model) still match SearchResponse."""
+    first = search(client, num_results=3).json()
+    assert set(first['results'][0]) == set(app_module.RESULT_FIELDS)
+    assert app_module.SearchResponse.model_validate(first).model_dump(exclude_unset=True) == first
+
+    page = search(client, num_results=3, offset=3, result_set_id=first['result_set_id']).json()
+    assert page['offset'] == 3
+    assert app_module.SearchResponse.model_validate(page).model_dump(exclude_unset=True) == page
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
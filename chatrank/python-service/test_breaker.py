@@ -0,0 +1,110 @@
+"""
+Unit tests for the upstream circuit breaker.
+"""
+import time
+import pytest
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from breaker import CircuitBreaker, CircuitOpenError
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+def make_breaker(clock, **kwargs):
+    options = dict(failure_rate=0.5, min_requests=4, window_seconds=60,
+                   open_seconds=30, half_open_probes=1, clock=clock)
+    options.update(kwargs)
+    return CircuitBreaker('test', **options)
+
+def test_opens_after_failure_rate():
+    """Test that the breaker opens once the failure rate is reached."""
+    clock = FakeClock()
+    breaker = make_breaker(clock)
+
+    for ok in (True, False, True):
+        breaker.before_call()
+        breaker.record_success() if ok else breaker.record_failure()
+    assert breaker.state == CircuitBreaker.CLOSED  # Below min_requests
+
+    breaker.before_call()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+
+    with pytest.raises(CircuitOpenError) as exc_info:
+        breaker.before_call()
+    assert 0 < exc_info.value.retry_after <= 30
+
+def test_half_open_probe_closes_or_reopens():
+    """Test half-open probing after the open period."""
+    clock = FakeClock()
+    breaker = make_breaker(clock, min_requests=1)
+
+    breaker.before_call()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+
+    clock.now += 31
+    breaker.before_call()  # The single probe is let through
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()  # Other calls still short-circuit
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+
+    clock.now += 31
+    breaker.before_call()
+    breaker.record_success(0.1)
+    assert breaker.state == CircuitBreaker.CLOSED
+    breaker.before_call()
+
+def test_old_outcomes_leave_the_window():
+    """Test that failures outside the window don't count."""
+    clock = FakeClock()
+    breaker = make_breaker(clock)
+
+    for _ in range(3):
+        breaker.record_failure()
+    clock.now += 61
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.CLOSED
+
+def test_adaptive_timeout():
+    """Test that the timeout follows observed latency within its bounds."""
+    clock = FakeClock()
+    breaker = make_breaker(clock, min_timeout=0.5, max_timeout=5.0, min_latency_samples=10)
+
+    assert breaker.timeout() == 5.0  # Not enough samples yet
+    for _ in range(20):
+        breaker.record_success(0.4)
+    assert breaker.timeout() == pytest.approx(0.8)  # p95 * 2
+
+    for _ in range(100):
+        breaker.record_success(0.01)
+    assert breaker.timeout() == 0.5  # Clamped to min_timeout
+
+def test_call_times_out_and_counts_failure():
+    """Test that call() enforces the timeout and records it as a failure."""
+    breaker = make_breaker(time.monotonic, min_requests=1, max_timeout=0.05)
+
+    with pytest.raises(FutureTimeoutError):
+        breaker.call(time.sleep, 0.5)
+    assert breaker.state == CircuitBreaker.OPEN
+    with pytest.raises(CircuitOpenError):
+        breaker.call(lambda: 'ok')
+
+def test_call_only_counts_classified_failures():
+    """Test that errors rejected by is_failure don't count against the upstream."""
+    breaker = make_breaker(time.monotonic, min_requests=1)
+
+    def bad_request():
+        raise ValueError("bad request")
+
+    with pytest.raises(ValueError):
+        breaker.call(bad_request, is_failure=lambda e: not isinstance(e, ValueError))
+    assert breaker.state == CircuitBreaker.CLOSED
+    with pytest.raises(ValueError):
+        breaker.call(bad_request)
+    assert breaker.state == CircuitBreaker.OPEN
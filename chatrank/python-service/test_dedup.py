@@ -0,0 +1,78 @@
+"""
+Unit tests for near-duplicate collapsing.
+"""
+import pytest
+import dedup
+from dedup import canonicalize_url, collapse_duplicates, hamming_distance, simhash
+
+SNIPPET = ("Machine learning is a field of study in artificial intelligence concerned with "
+           "the development of statistical algorithms that can learn from data")
+
+def result(url, snippet, title='Result'):
+    return {'title': title, 'url': url, 'domain': url.split('/')[2], 'snippet': snippet}
+
+def test_canonicalize_url():
+    """Test that URL variants of one page share a canonical form."""
+    canonical = canonicalize_url('https://example.com/ml/intro?b=2&a=1')
+    assert canonicalize_url('http://www.Example.com/ml/intro/?a=1&b=2&utm_source=feed#top') == canonical
+    assert canonicalize_url('https://m.example.com/ml/intro/amp?a=1&b=2') == canonical
+    assert canonicalize_url('https://example.com/ml/other?a=1&b=2') != canonical
+
+def test_malformed_urls():
+    """Test that URLs urlsplit rejects don't fail deduplication."""
+    assert canonicalize_url(' http://example.com:abc/ ') == 'http://example.com:abc/'
+    assert canonicalize_url('http://[bad/x') == 'http://[bad/x'
+
+    results = [
+        result('http://example.com:abc/page', SNIPPET),
+        result('http://[bad/x', "Gardening tips for spring planting of tomatoes and cucumbers"),
+        result('http://example.com:abc/page', "Same malformed URL, different snippet text here")
+    ]
+    assert [r['url'] for r in collapse_duplicates(results)] == ['http://example.com:abc/page', 'http://[bad/x']
+
+def test_simhash_near_duplicates():
+    """Test that small edits keep fingerprints close and other texts far."""
+    edited = SNIPPET.replace("field of study", "field of research")
+    other = "Gardening tips for spring planting of tomatoes and cucumbers in raised beds with compost"
+
+    assert hamming_distance(simhash(SNIPPET), simhash(edited)) <= 8
+    assert hamming_distance(simhash(SNIPPET), simhash(other)) > 16
+    assert simhash("too short") is None
+
+def test_simhash_caches_truncated_text():
+    """Test that long texts are fingerprinted (and cached) by their first DEDUP_MAX_CHARS."""
+    long_text = SNIPPET + " " + "filler words " * 1000
+    tail_edited = long_text + " with a different ending"
+
+    dedup._simhash.cache_clear()
+    assert simhash(long_text) == simhash(tail_edited)
+    assert dedup._simhash.cache_info().hits == 1
+    assert dedup._simhash.cache_info().currsize == 1
+
+def test_collapse_duplicates():
+    """Test that mirrors collapse into the first result with a duplicates list."""
+    results = [
+        result('https://example.com/ml', SNIPPET, 'Original'),
+        result('https://other.org/cooking', "How to cook pasta at home with fresh tomatoes and basil leaves"),
+        result('https://www.example.com/ml/?utm_source=x', "Different snippet, same page after canonicalization"),
+        result('https://mirror.net/copy', SNIPPET + " Read more", 'Mirror')
+    ]
+
+    collapsed = collapse_duplicates(results)
+
+    assert [r['url'] for r in collapsed] == ['https://example.com/ml', 'https://other.org/cooking']
+    assert [d['title'] for d in collapsed[0]['duplicates']] == ['Result', 'Mirror']
+    assert collapsed[1]['duplicates'] == []
+    assert 'duplicates' not in results[0]  # Inputs are not modified
+
+def test_collapse_duplicates_threshold_zero():
+    """Test that threshold 0 only collapses identical texts and URLs."""
+    results = [
+        result('https://a.com/1', SNIPPET),
+        result('https://b.com/2', SNIPPET + " and generalize"),
+        result('https://c.com/3', SNIPPET)
+    ]
+    assert len(collapse_duplicates(results, threshold=0)) == 2
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
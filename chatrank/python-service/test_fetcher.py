@@ -0,0 +1,177 @@
+"""
+Unit tests for page fetching with conditional revalidation.
+"""
+import os
+import time
+import pytest
+import fetcher
+from cache import Cache
+from fetcher import timed_extract
+
+ARTICLE = ("<html><body><main>" +
+           "<p>Machine learning systems learn patterns from data and improve with experience.</p>" * 5 +
+           "</main></body></html>").encode('utf-8')
+
+class FakeResponse:
+    def __init__(self, status_code, content=b'', headers=None, encoding='utf-8'):
+        self.status_code = status_code
+        self.content = content
+        self.headers = headers or {}
+        self.encoding = encoding
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise Exception(f"HTTP {self.status_code}")
+
+META_CHARSET_ARTICLE = ('<html><head><meta charset="utf-8"></head><body><main>' +
+                        '<p>Un café pour le rédacteur naïf et son résumé de la journée.</p>' * 5 +
+                        '</main></body></html>').encode('utf-8')
+
+def faulty_extract(url, content, encoding=None):
+    """timed_extract() that kills its worker process or hangs on marked pages."""
+    if b'CRASH' in content:
+        os._exit(1)
+    if b'HANG' in content:
+        time.sleep(3)
+    return timed_extract(url, content, encoding)
+
+@pytest.fixture
+def fake_web(monkeypatch):
+    """Parse in-thread with empty caches; responses are queued per test."""
+    monkeypatch.setattr(fetcher, 'EXTRACT_WORKERS', 0)
+    return mock_web(monkeypatch)
+
+@pytest.fixture
+def pool_web(monkeypatch):
+    """Like fake_web, but parsing in a real extraction pool running faulty_extract."""
+    monkeypatch.setattr(fetcher, 'EXTRACT_WORKERS', 2)
+    monkeypatch.setattr(fetcher, '_extraction_pool', None)
+    monkeypatch.setattr(fetcher, 'timed_extract', faulty_extract)
+    yield mock_web(monkeypatch)
+    fetcher.shutdown_extraction_pool()
+
+def mock_web(monkeypatch):
+    monkeypatch.setattr(fetcher, 'cache', Cache(ttl_seconds=3600))
+    monkeypatch.setattr(fetcher, 'page_validators', Cache(ttl_seconds=3600))
+    monkeypatch.setattr(fetcher, 'page_failures', Cache(ttl_seconds=3600))
+    web = {'responses': [], 'requests': [], 'pages': {}}
+
+    def fake_get(url, headers=None, timeout=None):
+        web['requests'].append(dict(headers or {}))
+        if url in web['pages']:
+            return FakeResponse(200, web['pages'][url])
+        return web['responses'].pop(0)
+
+    monkeypatch.setattr(fetcher.requests, 'get', fake_get)
+    return web
+
+def expire_page_text(url):
+    fetcher.cache.delete('page_text', url)
+
+def test_not_modified_skips_download_and_parse(fake_web):
+    """Test that an expired page is revalidated and a 304 reuses the extraction."""
+    url = 'https://example.com/article'
+    fake_web['responses'].append(FakeResponse(200, ARTICLE, {'ETag': '"v1"', 'Last-Modified': 'Mon, 01 Jan 2024 00:00:00 GMT'}))
+    first = fetcher.fetch_and_extract(url)
+    assert not first['preview_unavailable']
+
+    expire_page_text(url)
+    before = fetcher.get_fetch_stats()
+    fake_web['responses'].append(FakeResponse(304))
+    second = fetcher.fetch_and_extract(url)
+    after = fetcher.get_fetch_stats()
+
+    assert second == first
+    assert fake_web['requests'][-1]['If-None-Match'] == '"v1"'
+    assert fake_web['requests'][-1]['If-Modified-Since'] == 'Mon, 01 Jan 2024 00:00:00 GMT'
+    assert after['not_modified'] - before['not_modified'] == 1
+    assert after['bytes_saved'] - before['bytes_saved'] == len(ARTICLE)
+    assert after['parsed'] == before['parsed']
+
+def test_unchanged_content_hash_skips_parse(fake_web, monkeypatch):
+    """Test that a full download with the same content is not parsed again."""
+    url = 'https://example.com/no-validators'
+    fake_web['responses'].append(FakeResponse(200, ARTICLE))
+    first = fetcher.fetch_and_extract(url)
+
+    expire_page_text(url)
+    monkeypatch.setattr(fetcher, 'extract_from_html', lambda *args: pytest.fail("parsed again"))
+    fake_web['responses'].append(FakeResponse(200, ARTICLE))
+    before = fetcher.get_fetch_stats()
+    assert fetcher.fetch_and_extract(url) == first
+    assert fetcher.get_fetch_stats()['unchanged'] - before['unchanged'] == 1
+
+def test_failures_back_off(fake_web, monkeypatch):
+    """Test that failures are cached briefly, with a growing retry delay."""
+    url = 'https://example.com/down'
+    clock = {'now': 1000.0}
+    monkeypatch.setattr(fetcher.time, 'time', lambda: clock['now'])
+    monkeypatch.setattr(fetcher, 'FETCH_FAILURE_TTL_SECONDS', 60)
+
+    fake_web['responses'].append(FakeResponse(500))
+    assert fetcher.fetch_and_extract(url)['preview_unavailable']
+    assert fetcher.fetch_and_extract(url)['preview_unavailable']  # Negative cache, no request
+    assert len(fake_web['requests']) == 1
+
+    clock['now'] += 61
+    fake_web['responses'].append(FakeResponse(500))
+    fetcher.fetch_and_extract(url)
+    assert len(fake_web['requests']) == 2
+    clock['now'] += 61  # Second failure waits 120s
+    fetcher.fetch_and_extract(url)
+    assert len(fake_web['requests']) == 2
+
+    clock['now'] += 60
+    fake_web['responses'].append(FakeResponse(200, ARTICLE))
+    assert not fetcher.fetch_and_extract(url)['preview_unavailable']
+    assert fetcher.page_failures.get('page_failure', url) is None
+
+def test_meta_charset_without_header_charset(fake_web):
+    """Test that a UTF-8 page declaring its charset only in a meta tag isn't decoded as latin-1."""
+    # requests reports ISO-8859-1 for text/html without a charset parameter
+    fake_web['responses'].append(FakeResponse(200, META_CHARSET_ARTICLE, {'Content-Type': 'text/html'},
+                                              encoding='ISO-8859-1'))
+    result = fetcher.fetch_and_extract('https://example.com/utf8')
+
+    assert 'un café pour le rédacteur naïf et son résumé' in result['text']
+
+    fetcher.load_parsers()
+    html = fetcher.UnicodeDammit(META_CHARSET_ARTICLE, [], is_html=True).unicode_markup  # newspaper3k input
+    assert 'résumé' in html
+
+def test_crashing_worker_fails_only_its_page(pool_web):
+    """Test that pages lost with a crashed pool are retried and the crashing page isn't cached."""
+    pool_web['pages'] = {
+        'https://example.com/a': ARTICLE,
+        'https://example.com/crash': ARTICLE.replace(b'<main>', b'<main>CRASH'),
+        'https://example.com/b': ARTICLE
+    }
+
+    results = fetcher.fetch_and_extract_many(pool_web['pages'])
+
+    assert not results['https://example.com/a']['preview_unavailable']
+    assert not results['https://example.com/b']['preview_unavailable']
+    assert results['https://example.com/crash']['preview_unavailable']
+    assert fetcher.page_failures.get('page_failure', 'https://example.com/crash') is None
+    assert fetcher.cache.get('page_text', 'https://example.com/crash') is None
+
+    # The pool was replaced and keeps working
+    pool_web['pages'] = {'https://example.com/c': ARTICLE}
+    assert not fetcher.fetch_and_extract('https://example.com/c')['preview_unavailable']
+
+def test_extraction_timeout(pool_web, monkeypatch):
+    """Test that a page parsing for too long is given up on and backed off."""
+    pool_web['pages'] = {
+        'https://example.com/warm-up': ARTICLE,
+        'https://example.com/hang': ARTICLE.replace(b'<main>', b'<main>HANG')
+    }
+    fetcher.fetch_and_extract('https://example.com/warm-up')  # Pool start-up isn't part of the timeout
+    monkeypatch.setattr(fetcher, 'EXTRACT_TIMEOUT_SECONDS', 0.5)
+
+    start = time.monotonic()
+    assert fetcher.fetch_and_extract('https://example.com/hang')['preview_unavailable']
+    assert time.monotonic() - start < 2
+    assert fetcher.page_failures.get('page_failure', 'https://example.com/hang')['failures'] == 1
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
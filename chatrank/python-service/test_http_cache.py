@@ -0,0 +1,35 @@
+"""
+Unit tests for HTTP caching helpers.
+"""
+import pytest
+from http_cache import cache_headers, etag_matches, make_etag
+
+def test_make_etag_is_stable_and_weak():
+    """Test that ETags depend only on their inputs."""
+    etag = make_etag('search', 'abc', 0.6)
+    assert etag.startswith('W/"')
+    assert etag == make_etag('search', 'abc', 0.6)
+    assert etag != make_etag('search', 'abc', 0.5)
+
+def test_etag_matches():
+    """Test weak comparison against If-None-Match lists and '*'."""
+    etag = make_etag('page')
+    opaque = etag[2:]
+
+    assert etag_matches(etag, etag)
+    assert etag_matches(opaque, etag)  # Strong form of the same tag
+    assert etag_matches(f'W/"other", {etag}', etag)
+    assert etag_matches('*', etag)
+    assert not etag_matches('W/"other"', etag)
+    assert not etag_matches(None, etag)
+
+def test_cache_headers():
+    """Test Cache-Control for cacheable and degraded responses."""
+    assert cache_headers('W/"a"', 90.7) == {
+        'Vary': 'Accept-Encoding', 'Cache-Control': 'public, max-age=90', 'ETag': 'W/"a"'
+    }
+    assert cache_headers(None, None) == {'Vary': 'Accept-Encoding', 'Cache-Control': 'no-cache'}
+    assert cache_headers('W/"a"', 0)['Cache-Control'] == 'no-cache'
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
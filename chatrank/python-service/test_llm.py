@@ -0,0 +1,73 @@
+"""
+Unit tests for Gemini error handling.
+"""
+import pytest
+import llm
+from breaker import CircuitBreaker
+from cache import Cache
+from llm import GeminiUnavailable
+
+class FakeAPIError(Exception):
+    def __init__(self, message, code):
+        super().__init__(message)
+        self.code = code
+
+class BlockedResponse:
+    @property
+    def text(self):
+        raise ValueError("The `response.text` quick accessor requires a valid Part (finish_reason SAFETY)")
+
+def fake_gemini(outcome):
+    class FakeModel:
+        def __init__(self, name):
+            pass
+
+        def generate_content(self, prompt, generation_config=None):
+            if isinstance(outcome, Exception):
+                raise outcome
+            return outcome
+
+    class FakeGenai:
+        GenerativeModel = FakeModel
+
+    return lambda: FakeGenai
+
+@pytest.fixture
+def breaker(monkeypatch):
+    breaker = CircuitBreaker('test', min_requests=1)
+    monkeypatch.setattr(llm, 'GEMINI_API_KEY', 'test-key')
+    monkeypatch.setattr(llm, 'gemini_breaker', breaker)
+    monkeypatch.setattr(llm, 'cache', Cache(ttl_seconds=60))
+    return breaker
+
+@pytest.mark.parametrize('outcome', [
+    FakeAPIError("400 API key not valid", 400),
+    FakeAPIError("404 models/gemini-x is not found", 404),
+    BlockedResponse(),
+    type('EmptyResponse', (), {'text': ''})()
+])
+def test_request_errors_do_not_trip_breaker(breaker, monkeypatch, outcome):
+    """Test that bad keys/models and empty or blocked answers don't count as failures."""
+    monkeypatch.setattr(llm, 'initialize_gemini', fake_gemini(outcome))
+
+    with pytest.raises(GeminiUnavailable) as exc_info:
+        llm.get_ai_answer('query')
+    assert not exc_info.value.transient
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert breaker.snapshot()['recent_failure_rate'] == 0.0
+
+@pytest.mark.parametrize('outcome', [
+    FakeAPIError("503 The service is currently unavailable", 503),
+    FakeAPIError("500 Internal error", 500),
+    FakeAPIError("429 Resource exhausted", 429),
+    ConnectionError("Connection reset by peer"),
+    Exception("DNS resolution failed")
+])
+def test_transient_errors_trip_breaker(breaker, monkeypatch, outcome):
+    """Test that network, 429 and 5xx errors count against Gemini's health."""
+    monkeypatch.setattr(llm, 'initialize_gemini', fake_gemini(outcome))
+
+    with pytest.raises(GeminiUnavailable) as exc_info:
+        llm.get_ai_answer('query')
+    assert exc_info.value.transient
+    assert breaker.state == CircuitBreaker.OPEN
@@ -0,0 +1,89 @@
+"""
+Unit tests for the local inverted index.
+"""
+import json
+import os
+import pytest
+import local_index
+from local_index import LocalIndex, build_index, get_local_index, iter_jsonl
+
+DOCS = [
+    {'url': 'https://example.com/ml', 'title': 'Machine Learning',
+     'text': 'Machine learning lets computers learn patterns from data.'},
+    {'url': 'https://example.com/cooking', 'title': 'Cooking',
+     'text': 'Simple recipes for cooking pasta and rice at home.'},
+    {'url': 'https://example.org/rl', 'title': 'Reinforcement Learning',
+     'text': 'Reinforcement learning is machine learning driven by rewards. Learning learning.'},
+    {'url': 'https://example.org/empty', 'title': 'Empty', 'text': ''}
+]
+
+@pytest.fixture
+def index_dir(tmp_path):
+    # Tiny block size so the multi-block merge path is exercised
+    build_index(DOCS, str(tmp_path), block_size=4)
+    return str(tmp_path)
+
+def test_build_and_search(index_dir):
+    """Test that matching documents are returned best first."""
+    index = LocalIndex(index_dir)
+
+    assert index.num_docs == 3  # Empty document is skipped
+
+    results = index.search("machine learning", top_k=10)
+    urls = [r['url'] for r in results]
+
+    assert set(urls) == {'https://example.com/ml', 'https://example.org/rl'}
+    assert results[0]['raw_meta']['bm25_score'] >= results[1]['raw_meta']['bm25_score']
+    assert results[0]['raw_meta']['source'] == 'local'
+    assert results[0]['domain'] in ('example.com', 'example.org')
+    assert results[0]['text']
+
+def test_search_top_k_and_no_match(index_dir):
+    """Test top_k limiting and queries with no indexed terms."""
+    index = LocalIndex(index_dir)
+
+    assert len(index.search("learning", top_k=1)) == 1
+    assert index.search("quantum chromodynamics") == []
+
+def test_postings_sorted_by_doc(index_dir):
+    """Test that merged postings stay sorted by document id within each term."""
+    index = LocalIndex(index_dir)
+
+    for i in range(len(index.term_hashes)):
+        start, end = index.term_offsets[i], index.term_offsets[i + 1]
+        docs = index.postings_docs[start:end]
+        assert all(docs[j] < docs[j + 1] for j in range(len(docs) - 1))
+
+def test_rebuild_in_place_changes_build_id(index_dir):
+    """Test that rebuilding into the same directory gives the index a new build id."""
+    before = LocalIndex(index_dir)
+    build_index(DOCS, index_dir, block_size=4)
+    after = LocalIndex(index_dir)
+
+    assert after.num_docs == before.num_docs
+    assert after.build_id != before.build_id
+
+def test_rebuild_while_serving(tmp_path, monkeypatch):
+    """Test that a rebuild leaves the open index readable and is picked up without a restart."""
+    index_dir = str(tmp_path / 'index')
+    build_index(DOCS, index_dir)
+    monkeypatch.setattr(local_index, 'LOCAL_INDEX_DIR', index_dir)
+    monkeypatch.setattr(local_index, '_local_index', None)
+    old = get_local_index()
+    assert get_local_index() is old
+
+    build_index(DOCS[:2], index_dir)
+    new = get_local_index()
+
+    assert new is not old
+    assert new.build_id != old.build_id
+    assert new.num_docs == 2
+    assert old.search("machine learning")  # Old files stay mapped, not truncated
+    assert os.listdir(tmp_path) == ['index']  # No staging or retired directories left
+
+def test_iter_jsonl_skips_bad_lines(tmp_path):
+    """Test JSONL reading with a malformed line."""
+    path = tmp_path / 'dump.jsonl'
+    path.write_text(json.dumps(DOCS[0]) + '\nnot json\n\n' + json.dumps(DOCS[1]) + '\n')
+
+    assert [d['url'] for d in iter_jsonl(str(path))] == [DOCS[0]['url'], DOCS[1]['url']]
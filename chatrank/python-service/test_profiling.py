@@ -0,0 +1,137 @@
+"""
+Unit tests for request profiling and memory helpers.
+"""
+import cProfile
+import pstats
+import sys
+import threading
+import time
+import numpy as np
+import pytest
+import profiling
+from breaker import CircuitBreaker
+from cache import Cache
+
+def busy_work():
+    return sum(i * i for i in range(20000))
+
+def test_cprofile_merges_threads(tmp_path, monkeypatch):
+    """Test that work tracked on other threads ends up in one .prof file."""
+    monkeypatch.setattr(profiling, 'PROFILE_DIR', str(tmp_path))
+    profile = profiling.RequestProfile('cprofile', 'test')
+    profile.start()
+
+    def worker():
+        with profile.track():
+            busy_work()
+
+    with profile.track():
+        thread = threading.Thread(target=worker)
+        thread.start()
+        thread.join()
+    path = profile.finish()
+
+    assert path.endswith('.prof')
+    functions = {name for _, _, name in pstats.Stats(path).stats}
+    assert 'busy_work' in functions  # Worker thread
+    assert 'join' in functions  # Tracking thread
+    assert profiling.find_profile(profile.id) == path
+    assert profiling.find_profile('../etc/passwd') is None
+
+def test_profiled_request_across_threads(tmp_path, monkeypatch):
+    """Test that work handed to another thread (as in app.search) runs and is profiled."""
+    monkeypatch.setattr(profiling, 'PROFILE_DIR', str(tmp_path))
+    monkeypatch.setattr(profiling, 'PROFILING_ENABLED', True)
+    breaker = CircuitBreaker('test', min_requests=1)
+    profile = profiling.RequestProfile('cprofile', 'test')
+    profile.start()
+    token = profiling._active_profile.set(profile)
+    try:
+        with profile.track():
+            assert breaker.call(busy_work) == busy_work()  # Runs on the breaker's executor
+    finally:
+        profiling._active_profile.reset(token)
+    path = profile.finish()
+
+    assert breaker.snapshot()['recent_failure_rate'] == 0.0
+    assert 'busy_work' in {name for _, _, name in pstats.Stats(path).stats}
+
+def test_concurrent_cprofile_requests(tmp_path, monkeypatch):
+    """Test that overlapping cProfile requests both complete."""
+    monkeypatch.setattr(profiling, 'PROFILE_DIR', str(tmp_path))
+    first = profiling.RequestProfile('cprofile', 'first')
+    second = profiling.RequestProfile('cprofile', 'second')
+    first.start()
+    second.start()
+
+    def worker(profile):
+        with profile.track():
+            busy_work()
+
+    threads = [threading.Thread(target=worker, args=(p,)) for p in (first, second)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert first.finish() is not None
+    assert second.finish() is not None
+    if profiling.SHARED_PROFILER:
+        # One process-wide profiler at a time; the other request is sampled
+        assert (first.mode, second.mode) == ('cprofile', 'sample')
+        third = profiling.RequestProfile('cprofile', 'third')
+        third.start()
+        assert third.mode == 'cprofile'
+        third.finish()
+
+@pytest.mark.skipif(sys.version_info < (3, 12), reason="cProfile is per thread before 3.12")
+def test_cprofile_falls_back_when_hook_taken(tmp_path, monkeypatch):
+    """Test that another active profiler makes the request sample instead of failing."""
+    monkeypatch.setattr(profiling, 'PROFILE_DIR', str(tmp_path))
+    other = cProfile.Profile()
+    other.enable()
+    try:
+        profile = profiling.RequestProfile('cprofile', 'test')
+        profile.start()
+        with profile.track():
+            busy_work()
+        path = profile.finish()
+    finally:
+        other.disable()
+
+    assert profile.mode == 'sample'
+    assert path.endswith('.folded')
+
+def test_sampling_writes_collapsed_stacks(tmp_path, monkeypatch):
+    """Test that sampling mode writes folded stacks of tracked threads."""
+    monkeypatch.setattr(profiling, 'PROFILE_DIR', str(tmp_path))
+    profile = profiling.RequestProfile('sample', 'test')
+    profile.start()
+    with profile.track():
+        deadline = time.perf_counter() + 0.1
+        while time.perf_counter() < deadline:
+            busy_work()
+    path = profile.finish()
+
+    lines = open(path).read().splitlines()
+    assert lines
+    stack, count = lines[0].rsplit(' ', 1)
+    assert 'test_sampling_writes_collapsed_stacks' in stack
+    assert int(count) > 0
+
+def test_cache_memory_by_prefix():
+    """Test per-prefix entry counts and sizes."""
+    cache = Cache(ttl_seconds=60)
+    cache.set('gemini', 'q1', 'answer ' * 100)
+    cache.set('gemini', 'q2', 'answer')
+    cache.set('result_set', 'abc', {'scores': np.zeros(1000)})
+
+    stats = profiling.cache_memory(cache)
+    assert stats['gemini']['entries'] == 2
+    assert stats['result_set']['bytes'] > 8000
+
+def test_disabled_by_default():
+    """Test that helpers are no-ops when profiling is off."""
+    assert not profiling.PROFILING_ENABLED
+    assert profiling.propagate(busy_work) is busy_work
+    assert profiling.profiled(busy_work) is busy_work
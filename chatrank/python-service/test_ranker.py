@@ -2,7 +2,10 @@
 Unit tests for ranking logic.
 """
 import pytest
-from ranker import compute_ranking_metrics, normalize_scores, rank_documents
+from ranker import (
+    compute_ranking_metrics, compute_score_vectors, normalize_scores, rank_by_scores,
+    rank_documents, select_top_k
+)
 
 def test_normalize_scores():
     """Test min-max normalization."""
@@ -96,6 +99,51 @@ def test_rank_documents():
     for i in range(len(ranked) - 1):
         assert ranked[i]['combined_score'] >= ranked[i + 1]['combined_score']
 
+def test_select_top_k():
+    """Test partial top-k selection matches a stable descending sort."""
+    scores = [0.2, 0.9, 0.5, 0.9, 0.1, 0.5, 0.7]
+    
+    assert list(select_top_k(scores, 3)) == [1, 3, 6]
+    # Ties at the cut-off keep their original order
+    assert list(select_top_k(scores, 5)) == [1, 3, 6, 2, 5]
+    assert list(select_top_k(scores)) == sorted(range(len(scores)), key=lambda i: -scores[i])
+    assert len(select_top_k(scores, 0)) == 0
+
+def test_rank_documents_top_k():
+    """Test that top_k keeps only the best results in ranked order."""
+    query = "machine learning"
+    texts = [
+        "Cooking pasta at home",
+        "Machine learning models learn from data",
+        "Gardening tips for spring",
+        "Machine learning and deep learning for machine vision"
+    ]
+    full = rank_documents(query, [{'text': t} for t in texts], alpha=0.6)
+    top = rank_documents(query, [{'text': t} for t in texts], alpha=0.6, top_k=2)
+    
+    assert len(top) == 2
+    assert [r['text'] for r in top] == [r['text'] for r in full[:2]]
+
+def test_rank_by_scores_reuses_score_vectors():
+    """Test that recombining stored score vectors matches a full re-rank."""
+    query = "machine learning"
+    texts = [
+        "Cooking pasta at home",
+        "Machine learning models learn from data",
+        "Gardening tips for spring",
+        "Machine learning and deep learning for machine vision"
+    ]
+    candidates = [{'text': t} for t in texts]
+    cosine_scores, tfidf_scores = compute_score_vectors(query, candidates)
+    
+    for alpha in (0.0, 0.3, 0.6, 1.0):
+        expected = rank_documents(query, [{'text': t} for t in texts], alpha=alpha, top_k=3)
+        ranked = rank_by_scores(candidates, cosine_scores, tfidf_scores, alpha=alpha, top_k=3, copy=True)
+        assert ranked == expected
+    
+    # copy=True leaves the stored candidates unscored
+    assert all('combined_score' not in c for c in candidates)
+
 if __name__ == '__main__':
     pytest.main([__file__, '-v'])
 